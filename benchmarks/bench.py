@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""Hardware free raspi_ios benchmark
+
+Start RaspiIOServer on localhost with simulated hardware backend, then measure round trip latency and
+throughput of representative workloads, results are printed (or saved) as json:
+
+    $ python3 -m benchmarks.bench --output bench.json
+    $ python3 -m benchmarks.bench --mode multi --quick
+
+Simulated device timings are disabled by default, `--time-scale 1` to include them
+"""
+import os
+import json
+import time
+import base64
+import asyncio
+import hashlib
+import argparse
+import platform
+import websockets
+import multiprocessing
+from raspi_io.core import DATA_TRANSFER_BLOCK_SIZE
+
+# Select simulated backend before raspi_ios is imported
+os.environ.setdefault('RASPI_IOS_BACKEND', 'sim')
+
+from raspi_ios.version import version
+from raspi_ios.simulation import SimClock, SPI_NODES, SPI_FLASH_NODES, SERIAL_NODES
+
+BENCH_ADDRESS = '127.0.0.1'
+BENCH_PORT = 19876
+
+
+def run_server(address, port, single_port, time_scale):
+    SimClock.scale = time_scale
+    from raspi_ios import RaspiIOServer, get_handle_paths
+
+    server = RaspiIOServer(address=address, port=port, single_port=single_port)
+    for path in get_handle_paths():
+        server.register(path)
+
+    server.run_forever()
+
+
+def encode(data):
+    return base64.b64encode(bytes(data)).decode()
+
+
+class BenchResult(object):
+    def __init__(self, name, **params):
+        self.name = name
+        self.params = params
+        self.latencies = list()
+        self.bytes = 0
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+
+    def record(self, seconds, size=0):
+        self.latencies.append(seconds)
+        self.bytes += size
+
+    def stop(self):
+        self.seconds = time.perf_counter() - self.start
+        return self
+
+    def percentile(self, percent):
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percent / 100))]
+
+    @property
+    def dict(self):
+        requests = len(self.latencies)
+        return dict(
+            name=self.name,
+            params=self.params,
+            requests=requests,
+            seconds=round(self.seconds, 6),
+            requests_per_second=round(requests / self.seconds, 2) if self.seconds else 0,
+            bytes=self.bytes,
+            bytes_per_second=round(self.bytes / self.seconds, 2) if self.seconds else 0,
+            latency_us=dict(
+                mean=round(sum(self.latencies) / requests * 1e6, 2),
+                p50=round(self.percentile(50) * 1e6, 2),
+                p95=round(self.percentile(95) * 1e6, 2),
+                p99=round(self.percentile(99) * 1e6, 2),
+                max=round(max(self.latencies) * 1e6, 2),
+            ) if requests else dict()
+        )
+
+
+class BenchClient(object):
+    def __init__(self, address, port, single_port):
+        self.__port = port
+        self.__address = address
+        self.__single_port = single_port
+
+    async def connect(self, path):
+        """Connect to handle, multi-port mode first require a worker port from route server"""
+        port = self.__port
+        if not self.__single_port:
+            route = await websockets.connect("ws://{}:{}/{}".format(self.__address, self.__port, path))
+            port = json.loads(await route.recv()).get('data')
+            await route.close()
+
+        return await websockets.connect("ws://{}:{}/{}".format(self.__address, port, path))
+
+    async def wait_ready(self, timeout=10.0):
+        deadline = time.perf_counter() + timeout
+        while True:
+            try:
+                ws = await self.connect('query')
+                await ws.close()
+                return
+            except OSError:
+                if time.perf_counter() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+
+    @staticmethod
+    async def request(ws, handle, **kwargs):
+        kwargs['handle'] = handle
+        await ws.send(json.dumps(kwargs))
+        ack = json.loads(await ws.recv())
+        if not ack.get('ack'):
+            raise RuntimeError("{} failed: {}".format(handle, ack.get('data')))
+
+        return ack.get('data')
+
+    async def send_binary(self, ws, handle, data, **kwargs):
+        md5 = hashlib.md5(data).hexdigest()
+        slices = (len(data) + DATA_TRANSFER_BLOCK_SIZE - 1) // DATA_TRANSFER_BLOCK_SIZE
+        kwargs.update(handle=handle, md5=md5, size=len(data), slices=slices, format=kwargs.get('format', ''))
+        await ws.send(json.dumps(kwargs))
+        for i in range(slices):
+            await ws.send(data[i * DATA_TRANSFER_BLOCK_SIZE: (i + 1) * DATA_TRANSFER_BLOCK_SIZE])
+
+        ack = json.loads(await ws.recv())
+        if not ack.get('ack'):
+            raise RuntimeError("{} failed: {}".format(handle, ack.get('data')))
+
+    async def receive_binary(self, ws, handle, **kwargs):
+        kwargs['handle'] = handle
+        await ws.send(json.dumps(kwargs))
+        header = json.loads(await ws.recv())
+
+        data = bytearray()
+        for _ in range(header.get('slices')):
+            data += await ws.recv()
+
+        # Streaming mode, md5 is in the trailer
+        if kwargs.get('stream'):
+            header = json.loads(await ws.recv())
+
+        ack = json.loads(await ws.recv())
+        if not ack.get('ack') or hashlib.md5(data).hexdigest() != header.get('md5'):
+            raise RuntimeError("{} failed: {}".format(handle, ack.get('data')))
+
+        return data
+
+    async def gpio_toggle(self, count):
+        ws = await self.connect('gpio')
+        await self.request(ws, 'setmode', mode=11)
+        await self.request(ws, 'setup', channel=18, direction=0, pull_up_down=20, initial=0)
+
+        result = BenchResult('gpio_toggle', count=count)
+        for i in range(count):
+            start = time.perf_counter()
+            await self.request(ws, 'output', channel=18, value=i & 1)
+            result.record(time.perf_counter() - start)
+
+        await self.request(ws, 'cleanup', channel=18)
+        await ws.close()
+        return result.stop()
+
+    async def gpio_toggle_batch(self, count, batch):
+        ws = await self.connect('gpio')
+        await self.request(ws, 'setmode', mode=11)
+        await self.request(ws, 'setup', channel=18, direction=0, pull_up_down=20, initial=0)
+
+        result = BenchResult('gpio_toggle_batch', count=count, batch=batch)
+        requests = [dict(handle='output', channel=18, value=i & 1) for i in range(batch)]
+        for _ in range(count // batch):
+            start = time.perf_counter()
+            await self.request(ws, 'batch', requests=requests)
+            result.record(time.perf_counter() - start)
+
+        await self.request(ws, 'cleanup', channel=18)
+        await ws.close()
+        return result.stop()
+
+    async def spi_xfer2(self, count, size):
+        ws = await self.connect('spi')
+        await self.request(ws, 'open', device=SPI_NODES[0], max_speed=8000, mode=0,
+                           threewire=False, lsbfirst=False, cshigh=False, no_cs=False, loop=False)
+
+        result = BenchResult('spi_xfer2', count=count, size=size)
+        write_data = encode(bytes(range(256)) * (size // 256) + bytes(range(size % 256)))
+        for _ in range(count):
+            start = time.perf_counter()
+            await self.request(ws, 'xfer2', write_data=write_data, read_size=size, speed=0, delay=0)
+            result.record(time.perf_counter() - start, size * 2)
+
+        await self.request(ws, 'close')
+        await ws.close()
+        return result.stop()
+
+    async def serial_echo(self, count, size):
+        ws = await self.connect('serial')
+        await self.request(ws, 'init', port=SERIAL_NODES[0], baudrate=115200,
+                           bytesize=8, parity='N', stopbits=1, timeout=0.1)
+
+        result = BenchResult('serial_echo', count=count, size=size)
+        data = encode(bytes(size))
+        for _ in range(count):
+            start = time.perf_counter()
+            await self.request(ws, 'write', data=data)
+            await self.request(ws, 'read', size=size)
+            result.record(time.perf_counter() - start, size * 2)
+
+        await self.request(ws, 'close')
+        await ws.close()
+        return result.stop()
+
+    async def flash(self, chip_size, stream):
+        ws = await self.connect('spi_flash')
+        await self.request(ws, 'open', device=SPI_FLASH_NODES[0], speed=8000, cpol=0, cpha=0,
+                           chip_size=chip_size, page_size=256, instruction=dict())
+
+        data = hashlib.sha256(b'raspi_ios').digest() * (chip_size // 32)
+        write = BenchResult('flash_write_chip', chip_size=chip_size)
+        start = time.perf_counter()
+        await self.send_binary(ws, 'write_chip', data)
+        write.record(time.perf_counter() - start, chip_size)
+
+        read = BenchResult('flash_read_chip', chip_size=chip_size, stream=stream)
+        start = time.perf_counter()
+        if await self.receive_binary(ws, 'read_chip', stream=stream) != data:
+            raise RuntimeError("read_chip data mismatch")
+        read.record(time.perf_counter() - start, chip_size)
+
+        await ws.close()
+        return [write.stop(), read.stop()]
+
+    async def graph_upload(self, count, size):
+        ws = await self.connect('graph')
+        await self.request(ws, 'init', display_num=5)
+
+        result = BenchResult('graph_upload', count=count, size=size)
+        for i in range(count):
+            data = hashlib.sha256(str(i).encode()).digest() * (size // 32)
+            start = time.perf_counter()
+            await self.send_binary(ws, 'open', data, format='png')
+            result.record(time.perf_counter() - start, size)
+
+        await ws.close()
+        return result.stop()
+
+    async def run(self, quick=False):
+        scale = 10 if quick else 1
+        await self.wait_ready()
+
+        results = [
+            await self.gpio_toggle(5000 // scale),
+            await self.gpio_toggle_batch(5000 // scale, 100),
+        ]
+
+        for size in (16, 256, 4096):
+            results.append(await self.spi_xfer2(1000 // scale, size))
+
+        results.append(await self.serial_echo(1000 // scale, 64))
+
+        for chip_size in ((4,) if quick else (4, 16)):
+            for stream in (False, True):
+                results.extend(await self.flash(chip_size * 1024 * 1024, stream))
+
+        results.append(await self.graph_upload(20 // scale, 1024 * 1024))
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="raspi_ios hardware free benchmark")
+    parser.add_argument("--mode", choices=("single", "multi"), default="single", help="server port mode")
+    parser.add_argument("--port", type=int, default=BENCH_PORT, help="server listen port")
+    parser.add_argument("--time-scale", type=float, default=0.0, help="simulated device timing scale")
+    parser.add_argument("--quick", action="store_true", help="run a reduced workload")
+    parser.add_argument("--output", help="save json result to file, default print to stdout")
+    args = parser.parse_args()
+
+    single_port = args.mode == "single"
+    server = multiprocessing.Process(target=run_server, daemon=True,
+                                     args=(BENCH_ADDRESS, args.port, single_port, args.time_scale))
+    server.start()
+
+    try:
+        client = BenchClient(BENCH_ADDRESS, args.port, single_port)
+        results = asyncio.get_event_loop().run_until_complete(client.run(args.quick))
+    finally:
+        server.terminate()
+
+    report = dict(
+        meta=dict(version=version, mode=args.mode, quick=args.quick, time_scale=args.time_scale,
+                  python=platform.python_version(), machine=platform.machine(), timestamp=time.strftime("%Y-%m-%dT%H:%M:%S")),
+        results=[result.dict for result in results]
+    )
+
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(report, fp, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,15 @@
 #!/usr/bin/env python3.5
 import daemon
 import lockfile
-from raspi_ios.server import RaspiIOServer, get_registered_handles
+from raspi_ios.server import RaspiIOServer, get_handle_paths
 
 
 if __name__ == "__main__":
     with daemon.DaemonContext(pidfile=lockfile.FileLock("/var/run/raspi_io_server.pid")):
         server = RaspiIOServer()
 
-        for handle in get_registered_handles():
-            server.register(handle)
+        # Handle modules are imported on first connection, register them by path
+        for path in get_handle_paths():
+            server.register(path)
 
         server.run_forever()
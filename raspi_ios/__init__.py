@@ -1,29 +1,60 @@
+import sys
+import importlib
+from . import simulation
+
+# Simulated hardware modules must be installed before handles import them
+if simulation.is_enabled():
+    simulation.install()
+
+from .shm import *
 from .core import *
-from .i2c import *
-from .spi import *
-from .gpio import *
-from .graph import *
-from .query import *
-from .serial import *
+from .codec import *
+from .metrics import *
 from .server import *
-from .wireless import *
-from .tvservice import *
-from .spi_flash import *
-from .app_manager import *
-from .gpio_spi_flash import *
+from .server import HANDLE_MODULES, load_handle
+
+# Handle modules import hardware libraries, they are imported on first access
+__LAZY_EXPORTS = {
+    'i2c': ['RaspiI2CHandle'],
+    'spi': ['RaspiSPIHandle'],
+    'gpio': ['RaspiGPIOHandle'],
+    'graph': ['RaspiMmalGraphHandle'],
+    'query': ['RaspiQueryHandle'],
+    'serial': ['RaspiSerialHandle'],
+    'wireless': ['WPASupplicantConfParser', 'WPASupplicantConfParserError', 'RaspiWirelessHandle'],
+    'tvservice': ['RaspiTVServiceHandle'],
+    'spi_flash': ['RaspiSPIFlashHandle'],
+    'app_manager': ['RaspiAppManagerHandle', 'GogsSoftwareReleaseDesc', 'RepoRelease'],
+    'gpio_spi_flash': ['RaspiGPIOSPIFlashHandle'],
+}
+
+__LAZY_NAMES = {name: module for module, names in __LAZY_EXPORTS.items() for name in names}
 
 __all__ = (
+        shm.__all__ +
         core.__all__ +
-        i2c.__all__ +
-        spi.__all__ +
-        gpio.__all__ +
-        graph.__all__ +
-        query.__all__ +
-        serial.__all__ +
+        codec.__all__ +
+        metrics.__all__ +
         server.__all__ +
-        wireless.__all__ +
-        tvservice.__all__ +
-        spi_flash.__all__ +
-        app_manager.__all__ +
-        gpio_spi_flash.__all__
+        sorted(__LAZY_NAMES)
 )
+
+
+def __getattr__(name):
+    if name in __LAZY_EXPORTS:
+        return importlib.import_module(".{}".format(name), __name__)
+
+    if name in __LAZY_NAMES:
+        path = __LAZY_NAMES[name]
+        if HANDLE_MODULES.get(path, (None,))[0] == name:
+            return load_handle(path)
+
+        return getattr(importlib.import_module(".{}".format(path), __name__), name)
+
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+# Module __getattr__ requires Python 3.7+ (PEP 562), older Pythons import handle modules eagerly
+if sys.version_info < (3, 7):
+    for __name in __LAZY_NAMES:
+        globals()[__name] = __getattr__(__name)
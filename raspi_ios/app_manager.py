@@ -580,12 +580,16 @@ class RaspiAppManagerHandle(RaspiIOHandle):
         except (tarfile.TarError, IOError, OSError) as e:
             raise RuntimeError("Decompress software failed: {}".format(e))
 
-    async def install_app(self, ws, data):
-        install = InstallApp(**data)
+    def install_app(self, ws, data):
+        install = self.decode_request(InstallApp, data)
         app_desc = AppDescription(**install.app_desc)
         app_dir = self.get_app_dir(app_desc.app_name)
         install_package = os.path.join(self.TEMP_DIR, install.package)
 
+        # Package could be uploaded to upload cache by upload_blob
+        if not os.path.isfile(install_package):
+            install_package = self.find_blob(install.package) or install_package
+
         if not os.path.isfile(install_package):
             raise RuntimeError("App install package: {!r} do not exist".format(install_package))
 
@@ -614,16 +618,16 @@ class RaspiAppManagerHandle(RaspiIOHandle):
             os.system("chmod u+x {}".format(launch_script))
         return self.update_app(release_info, app_dir)
 
-    async def uninstall_app(self, ws, data):
-        uninstall = UninstallApp(**data)
+    def uninstall_app(self, ws, data):
+        uninstall = self.decode_request(UninstallApp, data)
         app_desc = self.check_app(uninstall.app_name)
 
         os.system("rm -rf {}".format(self.get_app_dir(app_desc.app_name)))
         os.system("rm {}".format(os.path.join(self.APP_LAUNCH_SCRIPT_DIR, "{}.sh".format(app_desc.app_name))))
         return True
 
-    async def fetch_update(self, ws, data):
-        fetch = FetchUpdate(**data)
+    def fetch_update(self, ws, data):
+        fetch = self.decode_request(FetchUpdate, data)
         gogs_request = GogsRequest(**fetch.auth)
 
         repo_releases = gogs_request.get_repo_releases(fetch.repo_name)
@@ -659,8 +663,8 @@ class RaspiAppManagerHandle(RaspiIOHandle):
 
         return release_list[0] if fetch.newest else release_list
 
-    async def online_update(self, ws, data):
-        update = OnlineUpdate(**data)
+    def online_update(self, ws, data):
+        update = self.decode_request(OnlineUpdate, data)
         gogs_request = GogsRequest(**update.auth)
 
         # Check app first
@@ -680,8 +684,8 @@ class RaspiAppManagerHandle(RaspiIOHandle):
         release_info = self.verify_app(self.TEMP_DIR, app_desc.exe_name)
         return self.update_app(release_info, self.get_app_dir(update.app_name))
 
-    async def local_update(self, ws, data):
-        update = LocalUpdate(**data)
+    def local_update(self, ws, data):
+        update = self.decode_request(LocalUpdate, data)
         if update.app_name == self.IO_SERVER_NAME:
             exe_name, update_path = self.IO_SERVER_NAME, self.IO_SERVER_PATH
         else:
@@ -695,8 +699,8 @@ class RaspiAppManagerHandle(RaspiIOHandle):
     async def get_app_list(self, ws, data):
         return os.listdir(self.APP_ROOT)
 
-    async def get_app_state(self, ws, data):
-        state = GetAppState(**data)
+    def get_app_state(self, ws, data):
+        state = self.decode_request(GetAppState, data)
         app_desc = self.check_app(state.app_name)
 
         app_name = app_desc.app_name
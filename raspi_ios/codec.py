@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import json
+from urllib.parse import parse_qs, urlparse
+__all__ = ['RaspiJSONCodec', 'RaspiMsgPackCodec', 'RaspiCBORCodec', 'get_codec', 'get_url_codec', 'CODEC_QUERY']
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+# Url query parameter select connection codec, e.g. ws://<address>:<port>/gpio?codec=msgpack
+CODEC_QUERY = 'codec'
+
+
+class RaspiJSONCodec(object):
+    """Default json text envelope, compatible with all raspi_io clients"""
+    name = 'json'
+    module = json
+
+    # Compact binary codec carry bytes payload natively, json carry it as base64 string
+    binary = False
+
+    # Request decode errors, json.JSONDecodeError is a ValueError
+    errors = (ValueError, TypeError)
+
+    @staticmethod
+    def loads(data):
+        return json.loads(data)
+
+    @staticmethod
+    def dumps(message):
+        return message.dumps()
+
+
+class RaspiMsgPackCodec(RaspiJSONCodec):
+    """MessagePack binary envelope, require msgpack"""
+    name = 'msgpack'
+    module = msgpack
+    binary = True
+
+    @staticmethod
+    def loads(data):
+        return msgpack.unpackb(data, raw=False)
+
+    @staticmethod
+    def dumps(message):
+        return msgpack.packb(message.dict, use_bin_type=True)
+
+
+class RaspiCBORCodec(RaspiJSONCodec):
+    """CBOR binary envelope, require cbor2"""
+    name = 'cbor'
+    module = cbor2
+    binary = True
+    errors = RaspiJSONCodec.errors + ((cbor2.CBORDecodeError,) if cbor2 is not None else ())
+
+    @staticmethod
+    def loads(data):
+        return cbor2.loads(data)
+
+    @staticmethod
+    def dumps(message):
+        return cbor2.dumps(message.dict)
+
+
+__CODECS = {codec.name: codec for codec in (RaspiJSONCodec, RaspiMsgPackCodec, RaspiCBORCodec)}
+
+
+def get_codec(name):
+    """Get codec by name
+
+    :param name: codec name (json, msgpack, cbor)
+    :return: codec class
+    """
+    codec = __CODECS.get(name)
+    if codec is None:
+        raise ValueError("unknown codec: {!r}".format(name))
+
+    if codec.module is None:
+        raise ValueError("codec {!r} is not available, python package is not installed".format(name))
+
+    return codec
+
+
+def get_url_codec(path):
+    """Get client request url selected codec, default is json
+
+    :param path: client request url path
+    :return: codec class
+    """
+    return get_codec(parse_qs(urlparse(path).query).get(CODEC_QUERY, [RaspiJSONCodec.name])[-1])
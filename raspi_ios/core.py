@@ -1,20 +1,120 @@
 # -*- coding: utf-8 -*-
+import io
 import os
-import json
+import re
+import sys
+import time
+import uuid
 import base64
+import socket
+import struct
+import pstats
+import asyncio
 import hashlib
+import inspect
+import cProfile
+import functools
+import collections
 import websockets
+import concurrent.futures
 from threading import Timer
-from collections import ChainMap
-from raspi_io.core import RaspiAckMsg, RaspiMsgDecodeError, RaspiBinaryDataHeader
+from .metrics import metrics
+from .shm import RaspiShmChannel
+from .codec import get_url_codec
+from .validator import RaspiMsgValidator
+from raspi_io.core import RaspiBaseMsg, RaspiAckMsg, RaspiMsgDecodeError, RaspiBinaryDataHeader, DATA_TRANSFER_BLOCK_SIZE
 __all__ = ['RaspiIOHandle']
 
+# time.perf_counter_ns is new in Python 3.7
+perf_counter_ns = getattr(time, 'perf_counter_ns', lambda: int(time.perf_counter() * 1000000000))
+
+
+class RaspiProfileRequest(RaspiBaseMsg):
+    _handle = 'profile_request'
+    _properties = {'request'}
+
+
+class RaspiBinaryMode(RaspiBaseMsg):
+    _handle = 'binary_mode'
+    _properties = {'enable'}
+
+
+class RaspiBinaryDataTrailer(RaspiBaseMsg):
+    _properties = {'md5', 'size'}
+
+
+class RaspiBlobQuery(RaspiBaseMsg):
+    _handle = 'has_blob'
+    _properties = {'md5'}
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('format', '')
+        super(RaspiBlobQuery, self).__init__(**kwargs)
+
+
+class RaspiShmAttach(RaspiBaseMsg):
+    _handle = 'shm_attach'
+    _properties = set()
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('size', 1024 * 1024)
+        super(RaspiShmAttach, self).__init__(**kwargs)
+
+
+class RaspiBatchRequest(RaspiBaseMsg):
+    _handle = 'batch'
+    _properties = {'requests'}
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('stop_on_error', True)
+        super(RaspiBatchRequest, self).__init__(**kwargs)
+
 
 class RaspiIOHandle(object):
     PATH = ""
     TEMP_DIR = '/tmp'
     CATCH_EXCEPTIONS = ()
 
+    # Content addressed upload cache (md5.format), least recently used blobs are evicted beyond size limit
+    BLOB_DIR = '/tmp/raspi_ios_blobs'
+    BLOB_STORE_SIZE = 256 * 1024 * 1024
+
+    # Blob name is client supplied, only lowercase hex md5 and known formats (raw, images, app packages) are accepted
+    BLOB_MD5 = re.compile('[0-9a-f]{32}')
+    BLOB_FORMATS = frozenset(['', 'bin', 'jpg', 'jpeg', 'png', 'bmp', 'gif', 'gz', 'bz2', 'xz'])
+
+    # Blocking (non-coroutine) handle execution policy, EXECUTE_THREAD run them on a thread
+    # bound to the device, requests are still processed in order, EXECUTE_INLINE run them in event loop
+    EXECUTE_INLINE = 'inline'
+    EXECUTE_THREAD = 'thread'
+    EXECUTION_POLICY = EXECUTE_THREAD
+
+    # Device executor, None means run blocking handle in event loop
+    executor = None
+    __dedicated_executor = False
+
+    # Current client connection
+    __ws = None
+
+    # Trusted client mode (set by server per instance), request required properties are not checked
+    trusted = False
+
+    # Request with 'id' is run as a task and its ack echoes the id, handles listed here start immediately
+    # (blocking one runs on a thread other than device executor), other blocking handles run one by one
+    CONCURRENT_HANDLES = frozenset()
+
+    # Request envelope fields, they are removed before request is passed to handle
+    ENVELOPE_FIELDS = frozenset(['id', 'trace'])
+
+    # Shared memory ring for local client bulk payload, ring size upper limit
+    SHM_MAX_SIZE = 64 * 1024 * 1024
+
+    # Request with 'trace' set will return time of each process phase in ack and record it in a ring buffer
+    TRACE_BUFFER_SIZE = 64
+
+    # Traced requests in process, key is id of request dict passed to handle, value is trace dict
+    __validate_traces = dict()
+
     @staticmethod
     def get_nodes():
         """Get support nodes
@@ -39,103 +139,828 @@ class RaspiIOHandle(object):
         :param data: data receive from network
         :return: data after decode
         """
+        # Compact binary codec carry payload as bytes
+        if isinstance(data, (bytes, bytearray)):
+            return bytes(data)
+
         # Convert b64 string to bytes
         # Python2 base64 after encode is str, python3 after encode is bytes()
         return base64.b64decode(data[2:-1]) if data.startswith("b'") and data.endswith("'") else base64.b64decode(data)
 
+    @classmethod
+    def decode_payload(cls, req, data):
+        """Get request payload, binary frame followed request first, otherwise decode from base64
+
+        :param req: request message
+        :param data: base64 encoded data
+        :return: payload bytes
+        """
+        payload = getattr(req, 'binary', None)
+        return payload if isinstance(payload, bytes) else cls.decode_data(data)
+
+    @classmethod
+    async def receive_payload(cls, ws, size):
+        """Receive binary frame followed request
+
+        :param ws: websocket
+        :param size: payload size
+        :return: payload bytes
+        """
+        payload = await cls.recv_frame(ws)
+        if not isinstance(payload, bytes) or len(payload) != size:
+            raise ValueError("payload size do not matched")
+
+        return payload
+
+    @classmethod
+    async def recv_frame(cls, ws):
+        """Receive a frame from client and account received bytes"""
+        data = await ws.recv()
+        metrics.observe_bytes(cls.PATH, received=len(data))
+        return data
+
+    @classmethod
+    async def send_frame(cls, ws, data):
+        """Send a frame to client and account sent bytes"""
+        metrics.observe_bytes(cls.PATH, sent=len(data))
+        await ws.send(data)
+
+    def decode_request(self, message, data):
+        """Decode request dict to raspi_io message with message class compiled validator
+
+        :param message: raspi_io message class
+        :param data: request dict
+        :return: message instance
+        """
+        trace = self.__validate_traces.get(id(data)) if self.__validate_traces else None
+        if trace is None:
+            return RaspiMsgValidator.get(message).decode(data, self.trusted)
+
+        # Traced request, handle's own decode is timed, request is not decoded again for tracing
+        start = perf_counter_ns()
+        try:
+            return RaspiMsgValidator.get(message).decode(data, self.trusted)
+        finally:
+            trace['validate_ns'] += perf_counter_ns() - start
+
     @staticmethod
     def reboot_system(delay):
         timer = Timer(delay, lambda: os.system("sync && sleep 3 && reboot"))
         timer.start()
 
+    @staticmethod
+    def is_request_handle(attr):
+        """Request handle is a function with signature handle(self, ws, data)"""
+        return inspect.isfunction(attr) and list(inspect.signature(attr).parameters)[1:] == ['ws', 'data']
+
     @classmethod
-    def create_instance(cls):
-        return cls()
+    def compile_handles(cls):
+        """Build request dispatch table once, cover the full MRO
 
-    async def process(self, ws, path):
-        nak = None
-        ack = None
-        while True:
-            try:
+        :return: dict, key is request name, value is (handle function, raspi_io message class or None)
+        """
+        if '_dispatch_table' in cls.__dict__:
+            return cls._dispatch_table
+
+        # Subclass handle override base class handle
+        handles = dict()
+        for klass in reversed(cls.__mro__):
+            handles.update({name: attr for name, attr in klass.__dict__.items() if cls.is_request_handle(attr)})
 
-                ack = nak = None
+        # Find request message class from handle module, message class _handle is request name
+        messages = dict()
+        for klass in reversed(cls.__mro__):
+            for obj in vars(sys.modules.get(klass.__module__, object)).values():
+                if inspect.isclass(obj) and issubclass(obj, RaspiBaseMsg) and getattr(obj, '_handle', None) in handles:
+                    messages[obj._handle] = obj
 
-                # Receive request
-                data = await ws.recv()
-                request = json.loads(data)
+        cls._dispatch_table = {name: (handle, messages.get(name)) for name, handle in handles.items()}
+        return cls._dispatch_table
 
-                # Get handle from request
-                handle = ChainMap(self.__class__.__dict__, self.__class__.__base__.__dict__).get(request.get('handle'))
+    def bind_handles(self):
+        """Bind dispatch table to this instance
+
+        :return: dict, key is request name, value is (bound coroutine function, raspi_io message class or None)
+        """
+        handles = dict()
+        for name, (handle, message) in self.compile_handles().items():
+            bound = handle.__get__(self, self.__class__)
+
+            # Non-coroutine handle is blocking device work, run it on device executor
+            if not asyncio.iscoroutinefunction(handle):
+                runner = self.run_concurrent if name in self.CONCURRENT_HANDLES else self.run_blocking
+                bound = functools.partial(runner, bound)
+
+            handles[name] = (bound, message)
+
+        return handles
+
+    @classmethod
+    def create_instance(cls, executor=None, trusted=False):
+        """Create a handle instance
+
+        :param executor: device executor shared by all clients of a device, if not set and EXECUTION_POLICY is
+        EXECUTE_THREAD, instance will create a dedicated single thread executor
+        :param trusted: trusted client, request required properties are not checked
+        :return: handle instance
+        """
+        instance = cls()
+        instance.trusted = trusted
+        if cls.EXECUTION_POLICY == cls.EXECUTE_INLINE:
+            executor = None
+        elif executor is None:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+            instance.__dedicated_executor = True
 
-                # Request process
-                if callable(handle):
-                    # Catch Runtime error
+        instance.executor = executor
+        return instance
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """Run blocking device call on device executor
+
+        :param func: blocking function
+        :param args: function args
+        :param kwargs: function kwargs
+        :return: function return value
+        """
+        if self.executor is None:
+            return func(*args, **kwargs)
+
+        return await asyncio.get_event_loop().run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def run_concurrent(self, func, *args, **kwargs):
+        """Run blocking call which is allowed to run concurrently with device executor work"""
+        if self.executor is None:
+            return func(*args, **kwargs)
+
+        return await asyncio.get_event_loop().run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    def shutdown(self):
+        """Release instance resources, called when client disconnected (and its session expired)
+
+        Handles release devices here instead of __del__, so a reconnected client could open the device again
+        immediately. Named shutdown, request handles (e.g. serial, spi) use close as request name
+        """
+        # Shared device executor is owned by server
+        if self.__dedicated_executor:
+            self.executor.shutdown(wait=False)
+
+    async def process(self, ws, path, resumable=False, local=False):
+        """Process client requests until connection closed
+
+        :param ws: websocket
+        :param path: client request url
+        :param resumable: client session could be resumed, instance is shutdown by session owner
+        :param local: client connected through unix domain socket
+        :return:
+        """
+        self.__ws = ws
+        self.__local = local
+        self.__codec = get_url_codec(path)
+        self.__shm = None
+        self.__binary_mode = False
+        self.__profile_request = None
+        self.__handles = self.bind_handles()
+        self.__traces = collections.deque(maxlen=self.TRACE_BUFFER_SIZE)
+        self.__validate_traces = dict()
+        self.__tasks = set()
+        self.__pending = None
+        self.__send_lock = asyncio.Lock()
+
+        try:
+            while True:
+                try:
+
+                    # Receive request
+                    data = await self.recv_frame(ws)
+                    start = perf_counter_ns()
                     try:
-                        ack = await handle(self, ws=ws, data=request)
-                    except self.CATCH_EXCEPTIONS as err:
-                        nak = 'Process request error:{}'.format(err)
-                else:
-                    nak = "{} unknown request:{}".format(path, request)
+                        request = self.__codec.loads(data)
+                    except self.__codec.errors as err:
+                        if ws.open:
+                            async with self.__send_lock:
+                                ack = RaspiAckMsg(ack=False, data='Parse request error:{}!'.format(err))
+                                await self.send_ack(ws, ack)
+                        continue
+
+                    decode_ns = perf_counter_ns() - start
+
+                    # Request process
+                    await self.schedule(ws, request, decode_ns)
+
+                except websockets.ConnectionClosed:
+                    print("Websocket{} is closed".format(ws.remote_address))
+                    break
+        finally:
+            for task in list(self.__tasks):
+                task.cancel()
+
+            # Bound handles reference instance, break the cycle so instance is freed without cyclic GC
+            self.close_shm()
+            self.__ws = None
+            self.__handles = dict()
+            self.__pending = None
+            if not resumable:
+                self.shutdown()
+
+    def is_connected(self):
+        """Instance is processing an open client connection"""
+        return self.__ws is not None and self.__ws.open
+
+    async def send_push(self, message):
+        """Send a server push message (not an ack of request, e.g. event notification) on current connection
+
+        :param message: RaspiBaseMsg
+        :return: True if sent, False if client is not connected
+        """
+        if not self.is_connected():
+            return False
+
+        async with self.__send_lock:
+            await self.send_frame(self.__ws, self.__codec.dumps(message))
+
+        return True
+
+    async def schedule(self, ws, request, decode_ns=None):
+        """Process request inline or run it as a task
+
+        Request without id is processed before next request is received. Request with id is run as a task,
+        handle in CONCURRENT_HANDLES starts immediately, other blocking handles start after previous one.
+        Coroutine handle may receive or send frames itself, so it is always processed inline
+
+        :param ws: websocket
+        :param request: request dict
+        :param decode_ns: request decode time
+        :return:
+        """
+        # Shared memory, payload is read from request ring in request arrival order
+        if isinstance(request, dict) and self.__shm is not None and isinstance(request.get('shm'), int):
+            try:
+                request['binary'] = self.__shm.request.read(request.get('shm'))
+            except ValueError as err:
+                ack = RaspiAckMsg(ack=False, data='Receive payload error:{}'.format(err))
+                if request.get('id') is not None:
+                    ack.id = request.get('id')
+
+                async with self.__send_lock:
+                    await self.send_ack(ws, ack)
+                return
+
+        name = request.get('handle') if isinstance(request, dict) else None
+        handle, _ = self.compile_handles().get(name, (None, None))
+        blocking = handle is not None and not asyncio.iscoroutinefunction(handle)
+        concurrent = name in self.CONCURRENT_HANDLES
+
+        if not isinstance(request, dict) or request.get('id') is None or not (blocking or concurrent):
+            await self.execute(ws, request, decode_ns, previous=self.__pending, exclusive=not blocking)
+            return
+
+        # Binary mode, payload frame must be received before next request
+        if self.__binary_mode and isinstance(request.get('binary'), int):
+            try:
+                request['binary'] = await self.receive_payload(ws, request.get('binary'))
+            except ValueError as err:
+                async with self.__send_lock:
+                    ack = RaspiAckMsg(ack=False, data='Receive payload error:{}'.format(err), id=request.get('id'))
+                    await self.send_ack(ws, ack)
+                return
+
+        previous = None if concurrent else self.__pending
+        task = asyncio.ensure_future(self.execute(ws, request, decode_ns, previous=previous))
+        task.add_done_callback(self.task_done)
+        self.__tasks.add(task)
+        if not concurrent:
+            self.__pending = task
+
+    def task_done(self, task):
+        self.__tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            if not isinstance(task.exception(), websockets.ConnectionClosed):
+                print("Process request error: {!r}".format(task.exception()))
+
+    async def execute(self, ws, request, decode_ns=None, previous=None, exclusive=False):
+        """Dispatch request and send its ack
+
+        :param ws: websocket
+        :param request: request dict
+        :param decode_ns: request decode time
+        :param previous: previous serialized request task, wait it done first
+        :param exclusive: hold send lock while processing, handle may send frames itself
+        :return:
+        """
+        if previous is not None and not previous.done():
+            await asyncio.wait([previous])
+
+        if exclusive:
+            await self.__send_lock.acquire()
 
-            except (RaspiMsgDecodeError, json.JSONDecodeError) as err:
-                nak = 'Parse request error:{}!'.format(err)
-            except websockets.ConnectionClosed:
-                print("Websocket{} is closed".format(ws.remote_address))
+        try:
+            replay = await self.dispatch(ws, request)
+            if isinstance(getattr(replay, 'trace', None), dict):
+                replay.trace['decode_ns'] = decode_ns
+
+            # Echo request id, so client could match out of order acks
+            if isinstance(request, dict) and request.get('id') is not None:
+                replay.id = request.get('id')
+
+            if not ws.open:
+                return
+
+            if exclusive:
+                await self.send_ack(ws, replay)
+            else:
+                async with self.__send_lock:
+                    await self.send_ack(ws, replay)
+        finally:
+            if exclusive:
+                self.__send_lock.release()
+
+    async def send_ack(self, ws, ack):
+        """Send ack to client, bytes type ack data is payload
+
+        :param ws: websocket
+        :param ack: RaspiAckMsg
+        :return:
+        """
+        start = perf_counter_ns()
+        payload = ack.data
+        trace = getattr(ack, 'trace', None)
+        extra = {key: getattr(ack, key) for key in ('trace', 'id') if getattr(ack, key, None) is not None}
+
+        if not isinstance(payload, (bytes, bytearray)):
+            frames = [self.__codec.dumps(ack)]
+        elif self.__shm is not None and len(payload) <= self.__shm.reply.writable():
+            # Shared memory, payload is written to reply ring and ack carries payload size
+            self.__shm.reply.write(payload)
+            frames = [self.__codec.dumps(RaspiAckMsg(ack=True, data="", shm=len(payload), **extra))]
+        elif self.__codec.binary:
+            # Compact binary codec carry payload in ack msg natively
+            frames = [self.__codec.dumps(RaspiAckMsg(ack=True, data=bytes(payload), **extra))]
+        elif self.__binary_mode:
+            # Binary mode, ack msg reference a following binary frame
+            frames = [self.__codec.dumps(RaspiAckMsg(ack=True, data="", binary=len(payload), **extra)), bytes(payload)]
+        else:
+            frames = [self.__codec.dumps(RaspiAckMsg(ack=True, data=self.encode_data(payload), **extra))]
+
+        encoded = perf_counter_ns()
+        for frame in frames:
+            await self.send_frame(ws, frame)
+
+        if trace is not None:
+            trace.update(encode_ns=encoded - start, send_ns=perf_counter_ns() - encoded)
+            self.__traces.append(trace)
+
+    async def dispatch(self, ws, request):
+        """Dispatch a request to its handle
+
+        :param ws: websocket
+        :param request: request dict
+        :return: RaspiAckMsg
+        """
+        # Binary mode, request payload is in the following binary frame
+        if self.__binary_mode and isinstance(request.get('binary'), int):
+            try:
+                request['binary'] = await self.receive_payload(ws, request.get('binary'))
+            except ValueError as err:
+                return RaspiAckMsg(ack=False, data='Receive payload error:{}'.format(err))
+
+        # Get handle from request
+        name = request.get('handle')
+        handle, _ = self.__handles.get(name, (None, None))
+        if not callable(handle):
+            metrics.observe_request(self.PATH, 'unknown', 0.0, error=True)
+            return RaspiAckMsg(ack=False, data="{} unknown request:{}".format(self.PATH, request))
+
+        trace = dict(request=name) if request.get('trace') else None
+        profiler, handle = self.start_profile(name, handle)
+
+        # Handles may use request dict as is (e.g. wireless network config), do not pass envelope fields
+        if not self.ENVELOPE_FIELDS.isdisjoint(request):
+            request = {key: value for key, value in request.items() if key not in self.ENVELOPE_FIELDS}
+
+        # Tracing, request validation is timed when handle decodes the request
+        if trace is not None:
+            trace['validate_ns'] = 0
+            self.__validate_traces[id(request)] = trace
+
+        # Catch Runtime error
+        start = perf_counter_ns()
+        try:
+            ack = await handle(ws=ws, data=request)
+            replay = RaspiAckMsg(ack=True, data=ack if ack is not None else "")
+        except RaspiMsgDecodeError as err:
+            replay = RaspiAckMsg(ack=False, data='Parse request error:{}!'.format(err))
+        except self.CATCH_EXCEPTIONS as err:
+            replay = RaspiAckMsg(ack=False, data='Process request error:{}'.format(err))
+        finally:
+            self.stop_profile(name, profiler)
+            if trace is not None:
+                self.__validate_traces.pop(id(request), None)
+
+        finished = perf_counter_ns()
+        metrics.observe_request(self.PATH, name, (finished - start) / 1000000000, error=not replay.ack)
+
+        if trace is not None:
+            trace['handle_ns'] = finished - start - trace['validate_ns']
+            replay.trace = trace
+
+        return replay
+
+    def start_profile(self, name, handle):
+        """Start a one-shot cProfile capture if name is the request to be profiled
+
+        :param name: request name
+        :param handle: request bound handle
+        :return: (profiler or None, handle to call for this request)
+        """
+        if name is None or name != self.__profile_request:
+            return None, handle
+
+        self.__profile_request = None
+        profiler = cProfile.Profile()
+
+        # Coroutine handle is profiled in event loop
+        if not isinstance(handle, functools.partial):
+            profiler.enable()
+            return profiler, handle
+
+        # Blocking handle is profiled only in the thread running this request, other requests are not counted
+        runner, bound = handle.func, handle.args[0]
+        return profiler, functools.partial(runner, profiler.runcall, bound)
+
+    def stop_profile(self, name, profiler):
+        if profiler is None:
+            return
+
+        profiler.disable()
+
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(30)
+        self.__traces.append(dict(request=name, profile=stream.getvalue()))
+
+    async def get_traces(self, ws, data):
+        """Fetch and clear request trace ring buffer
+
+        :param ws: websocket
+        :param data: request
+        :return: trace list
+        """
+        traces = list(self.__traces)
+        self.__traces.clear()
+        return traces
+
+    async def profile_request(self, ws, data):
+        """Capture cProfile of next specified request, result can be fetched by get_traces
+
+        :param ws: websocket
+        :param data: RaspiProfileRequest
+        :return: True
+        """
+        profile = self.decode_request(RaspiProfileRequest, data)
+        if profile.request not in self.__handles:
+            raise RaspiMsgDecodeError("unknown request: {!r}".format(profile.request))
+
+        self.__profile_request = profile.request
+        return True
+
+    async def binary_mode(self, ws, data):
+        """Enable or disable binary mode, in binary mode payload is transferred as raw binary frame
+
+        Request with field 'binary' (payload size) is followed by a binary frame,
+        ack with field 'binary' is followed by a binary frame too
+
+        :param ws: websocket
+        :param data: RaspiBinaryMode
+        :return: True
+        """
+        mode = self.decode_request(RaspiBinaryMode, data)
+        self.__binary_mode = bool(mode.enable)
+        return True
+
+    @staticmethod
+    def get_peer_uid(ws):
+        """Get unix domain socket peer uid
+
+        :param ws: websocket
+        :return: peer uid or None
+        """
+        try:
+            sock = ws.writer.get_extra_info('socket')
+            _, uid, _ = struct.unpack('3i', sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i')))
+            return uid
+        except (AttributeError, OSError, struct.error):
+            return None
+
+    async def shm_attach(self, ws, data):
+        """Create shared memory rings for this connection (unix domain socket client only)
+
+        After attached, request with 'shm' field (payload size) read its payload from request ring, bytes ack
+        payload is written to reply ring if it has space, ack carries 'shm' field (payload size) instead of data
+
+        :param ws: websocket
+        :param data: RaspiShmAttach
+        :return: shared memory file path and ring size
+        """
+        attach = self.decode_request(RaspiShmAttach, data)
+        if not self.__local:
+            raise RaspiMsgDecodeError("shared memory is only available to unix domain socket clients")
+
+        if not isinstance(attach.size, int) or not 0 < attach.size <= self.SHM_MAX_SIZE:
+            raise RaspiMsgDecodeError("invalid shared memory size:{!r}".format(attach.size))
+
+        # Shared memory file is only accessible to client user
+        self.close_shm()
+        try:
+            self.__shm = RaspiShmChannel(attach.size, self.get_peer_uid(ws))
+        except OSError as err:
+            raise RaspiMsgDecodeError("create shared memory error: {}".format(err))
+        return dict(path=self.__shm.path, size=attach.size)
+
+    async def shm_detach(self, ws, data):
+        """Release connection shared memory rings
+
+        :param ws: websocket
+        :param data: no use
+        :return: True
+        """
+        self.close_shm()
+        return True
+
+    def close_shm(self):
+        if self.__shm is not None:
+            self.__shm.close()
+            self.__shm = None
+
+    async def batch(self, ws, data):
+        """Execute a list of requests back to back
+
+        :param ws: websocket
+        :param data: RaspiBatchRequest
+        :return: ack list of each executed request
+        """
+        batch = self.decode_request(RaspiBatchRequest, data)
+        if not isinstance(batch.requests, list):
+            raise RaspiMsgDecodeError("batch requests should be a list")
+
+        acks = list()
+        for request in batch.requests:
+            if isinstance(request, dict) and request.get('handle') != batch.handle:
+                ack = await self.dispatch(ws, request)
+            else:
+                ack = RaspiAckMsg(ack=False, data="Invalid batch request:{}".format(request))
+
+            # Batch ack payload always encode as base64
+            if isinstance(ack.data, (bytes, bytearray)):
+                ack = RaspiAckMsg(ack=True, data=self.encode_data(ack.data))
+
+            acks.append(ack.dict)
+            if not ack.ack and batch.stop_on_error:
+                break
+
+        return acks
+
+    async def has_blob(self, ws, data):
+        """Check if blob is in upload cache, if so client could send header with slices 0 instead of upload
+
+        :param ws: websocket
+        :param data: RaspiBlobQuery
+        :return: True if blob is cached
+        """
+        query = self.decode_request(RaspiBlobQuery, data)
+        return self.get_blob(query.md5, query.format) is not None
+
+    async def upload_blob(self, ws, data):
+        """Upload binary data to upload cache
+
+        :param ws: websocket
+        :param data: RaspiBinaryDataHeader
+        :return: blob name
+        """
+        return os.path.basename(await self.receive_binary_file(ws, data))
+
+    @classmethod
+    def get_blob_path(cls, md5, fmt=""):
+        """Get blob path in upload cache
+
+        :param md5: blob md5
+        :param fmt: blob format
+        :return: blob path, invalid md5 or format raise ValueError
+        """
+        if not isinstance(md5, str) or not cls.BLOB_MD5.fullmatch(md5):
+            raise ValueError("invalid blob md5: {!r}".format(md5))
+
+        if not isinstance(fmt, str) or fmt not in cls.BLOB_FORMATS:
+            raise ValueError("unsupported blob format: {!r}".format(fmt))
+
+        return os.path.join(cls.BLOB_DIR, "{}.{}".format(md5, fmt) if fmt else md5)
+
+    @classmethod
+    def get_blob(cls, md5, fmt=""):
+        """Get cached blob path and mark it as recently used
+
+        :param md5: blob md5
+        :param fmt: blob format
+        :return: blob path or None
+        """
+        try:
+            path = cls.get_blob_path(md5, fmt)
+            os.utime(path)
+            return path
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def find_blob(cls, name):
+        """Get cached blob path by blob name(md5.format)"""
+        md5, _, fmt = os.path.basename(name).partition('.')
+        return cls.get_blob(md5, fmt)
+
+    @classmethod
+    def store_blob(cls, md5, fmt, data):
+        """Save data to upload cache
+
+        :param md5: data md5
+        :param fmt: data format
+        :param data: binary data
+        :return: blob path
+        """
+        path = cls.get_blob_path(md5, fmt)
+        if cls.get_blob(md5, fmt) is not None:
+            return path
+
+        os.makedirs(cls.BLOB_DIR, exist_ok=True)
+        part_path = "{}.{}.part".format(path, uuid.uuid4().hex)
+        with open(part_path, "wb") as fp:
+            fp.write(data)
+
+        os.rename(part_path, path)
+        cls.evict_blobs(path)
+        return path
+
+    @classmethod
+    def evict_blobs(cls, keep):
+        """Remove least recently used blobs until upload cache size below limit
+
+        :param keep: blob path should not be removed
+        :return:
+        """
+        try:
+            blobs = [(entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                     for entry in os.scandir(cls.BLOB_DIR) if entry.is_file() and not entry.name.endswith('.part')]
+        except OSError:
+            return
+
+        total = sum(size for _, size, _ in blobs)
+        for _, size, path in sorted(blobs):
+            if total <= cls.BLOB_STORE_SIZE:
                 break
-            finally:
-                if ws.open:
-                    # Generate ack msg
-                    if nak is not None:
-                        replay = RaspiAckMsg(ack=False, data=nak)
-                    else:
-                        replay = RaspiAckMsg(ack=True, data=ack if ack is not None else "")
 
-                    await ws.send(replay.dumps())
+            if path == keep:
+                continue
+
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
 
     async def receive_binary_file(self, ws, data):
         """Common receive binary file handle, receive binary data stream form ws
 
         :param ws: websocket
         :param data: RaspiBinaryDataHeader include data size, slices, md5 format etc
-        :return: success return True, failed raise exception
+        :return: success return file path, failed raise exception
         """
-        header = RaspiBinaryDataHeader(**data)
+        header = self.decode_request(RaspiBinaryDataHeader, data)
 
         try:
-            await self.receive_binary_data(ws, header, save_as_file=True)
+            return await self.receive_binary_data(ws, header, save_as_file=True)
         except (ValueError, IOError) as e:
             raise RuntimeError('Receive file failed: {}'.format(e))
 
-        return os.path.join("/tmp", "{}.{}".format(header.md5, header.format))
+    @classmethod
+    async def receive_binary_data(cls, ws, header, save_as_file=False, cache=False, max_size=None):
+        """Command receive binary data handle, stream slices to a buffer or file
 
-    @staticmethod
-    async def receive_binary_data(ws, header, save_as_file=False):
-        """Command receive binary data handle
+        Header with slices 0 and non-zero size refer to a blob in upload cache, data will not be transferred
 
         :param ws: websocket
         :param header: RaspiBinaryDataHeader
-        :param save_as_file: if set will save binary data as a file (file name is md5.format save at /tmp)
-        :return: binary data(type bytes)
+        :param save_as_file: if set will save binary data as a file in upload cache (file name is md5.format)
+        :param cache: if set received binary data also saved to upload cache
+        :param max_size: max data size handle accepts (e.g. flash chip size), default is BLOB_STORE_SIZE
+        :return: binary data(type bytearray), if save_as_file is set return file path
         """
-        binary_data = bytes()
+        # Size is client declared, buffer grows as slices arrive instead of being allocated by header
+        max_size = cls.BLOB_STORE_SIZE if max_size is None else max_size
+        if not isinstance(header.size, int) or not 0 <= header.size <= max_size:
+            raise ValueError("data size error: {!r}".format(header.size))
 
-        # Receive graph binary data
-        for i in range(header.slices):
-            temp = await ws.recv()
-            binary_data += temp
+        if header.slices == 0 and header.size:
+            file_path = cls.get_blob(header.md5, header.format)
+            if file_path is None:
+                raise ValueError("blob {!r} do not cached".format(header.md5))
 
-        # Check graph size
-        if len(binary_data) != header.size:
-            raise ValueError("data size do not matched")
+            if os.path.getsize(file_path) != header.size:
+                raise ValueError("blob {!r} size do not matched".format(header.md5))
 
-        # Check graph md5
-        if hashlib.md5(binary_data).hexdigest() != header.md5:
-            raise ValueError("data md5 checksum do not matched")
+            if save_as_file:
+                return file_path
 
-        # Save graph to a temporary file
+            with open(file_path, "rb") as fp:
+                return bytearray(fp.read())
+
+        md5 = hashlib.md5()
+        received = 0
+
+        # Only data saved to upload cache requires a valid blob name
         if save_as_file:
-            file_path = os.path.join("/tmp", "{}.{}".format(header.md5, header.format))
-            with open(file_path, "wb") as fp:
-                fp.write(binary_data)
+            file_path = cls.get_blob_path(header.md5, header.format)
+            part_path = "{}.{}.part".format(file_path, uuid.uuid4().hex)
+            os.makedirs(cls.BLOB_DIR, exist_ok=True)
+            fp = open(part_path, "wb")
+        else:
+            binary_data = bytearray()
+
+        try:
+            # Receive binary data slice by slice
+            for i in range(header.slices):
+                temp = await cls.recv_frame(ws)
+                if not isinstance(temp, bytes):
+                    raise ValueError("data slice should be binary frame")
+
+                # Abort as soon as data size overflow
+                if received + len(temp) > header.size:
+                    raise ValueError("data size do not matched")
+
+                md5.update(temp)
+                if save_as_file:
+                    fp.write(temp)
+                else:
+                    binary_data.extend(temp)
+
+                received += len(temp)
+
+            # Check data size
+            if received != header.size:
+                raise ValueError("data size do not matched")
+
+            # Check data md5
+            if md5.hexdigest() != header.md5:
+                raise ValueError("data md5 checksum do not matched")
+        except BaseException:
+            # Also cleanup when receiving is cancelled (client disconnected)
+            if save_as_file:
+                fp.close()
+                os.remove(part_path)
+            raise
+
+        if not save_as_file:
+            if cache:
+                try:
+                    await asyncio.get_event_loop().run_in_executor(
+                        None, cls.store_blob, header.md5, header.format, binary_data)
+                except ValueError as err:
+                    # Data is received, it is just not cacheable by its name
+                    print("Binary data is not cached: {}".format(err))
+            return binary_data
+
+        fp.close()
+        os.rename(part_path, file_path)
+        cls.evict_blobs(file_path)
+        return file_path
+
+    async def send_binary_stream(self, ws, size, reader, fmt=""):
+        """Stream binary data to ws, next slice is read on device executor while current slice is sending
+
+        Send a header without md5 first, then data slices, finally a trailer carry md5 and size
+
+        :param ws: websocket
+        :param size: binary data size
+        :param reader: blocking function reader(offset, size) return bytes
+        :param fmt: binary data format
+        :return: binary data md5
+        """
+        md5 = hashlib.md5()
+        slices = (size + DATA_TRANSFER_BLOCK_SIZE - 1) // DATA_TRANSFER_BLOCK_SIZE
+        await self.send_frame(ws, RaspiBinaryDataHeader(md5="", size=size, slices=slices, format=fmt).dumps())
+
+        def read_slice(index):
+            offset = index * DATA_TRANSFER_BLOCK_SIZE
+            return asyncio.ensure_future(self.run_blocking(reader, offset, min(DATA_TRANSFER_BLOCK_SIZE, size - offset)))
+
+        pending = read_slice(0) if slices else None
+
+        try:
+            for i in range(slices):
+                data = bytes(await pending)
+                pending = read_slice(i + 1) if i + 1 < slices else None
+
+                md5.update(data)
+                await self.send_frame(ws, data)
+        finally:
+            if pending is not None:
+                pending.cancel()
 
-        return binary_data
+        await self.send_frame(ws, RaspiBinaryDataTrailer(md5=md5.hexdigest(), size=size).dumps())
+        return md5.hexdigest()
@@ -1,31 +1,127 @@
 # -*- coding: utf-8 -*-
+import time
 import uuid
+import asyncio
+import functools
+import itertools
+import websockets
+import collections
 import RPi.GPIO as GPIO
 from .core import RaspiIOHandle
 from .server import register_handle
+from raspi_io.core import RaspiBaseMsg
 from raspi_io.gpio import GPIOMode, GPIOSetup, GPIOCleanup, GPIOCtrl, GPIOChannel, \
     GPIOSoftPWM, GPIOSoftPWMCtrl, GPIOSoftSPI, GPIOSoftSPIXfer, GPIOSoftSPIRead, GPIOSoftSPIWrite
+from .gpio_soft_spi import GPIOSoftSPIEngine
+from .gpio_soft_pwm import GPIOSoftPWMScheduler
+from .gpio_logic_analyzer import GPIOLogicAnalyzer
+from .gpio_port import GPIOPortBackend, GPIOMemPortBackend, GPIOLibPortBackend, get_port_backend
 __all__ = ['RaspiGPIOHandle']
 
 
+class GPIOPortCtrl(RaspiBaseMsg):
+    _handle = 'output_port'
+    _properties = {'mask', 'value'}
+
+
+class GPIOPortSample(RaspiBaseMsg):
+    _handle = 'input_port'
+    _properties = {'mask'}
+
+
+class GPIOEventSubscribe(RaspiBaseMsg):
+    _handle = 'subscribe'
+    _properties = {'channel', 'edge'}
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('bouncetime', 0)
+        kwargs.setdefault('queue_depth', 0)
+        super(GPIOEventSubscribe, self).__init__(**kwargs)
+
+
+class GPIOEventUnsubscribe(RaspiBaseMsg):
+    _handle = 'unsubscribe'
+    _properties = {'channel'}
+
+
+class GPIOEventPush(RaspiBaseMsg):
+    _handle = 'event'
+    _properties = {'events', 'overflow'}
+
+
+class GPIOCapture(RaspiBaseMsg):
+    _handle = 'capture'
+    _properties = {'mask', 'rate'}
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('pre', 0)
+        kwargs.setdefault('post', 1024)
+        kwargs.setdefault('trigger', None)
+        kwargs.setdefault('timeout', 1.0)
+        super(GPIOCapture, self).__init__(**kwargs)
+
+
+class GPIOSoftPWMStats(RaspiBaseMsg):
+    _handle = 'pwm_stats'
+    _properties = {'uuid'}
+
+
+class GPIOSoftSPIStats(RaspiBaseMsg):
+    _handle = 'spi_stats'
+    _properties = {'uuid'}
+
+
 @register_handle
 class RaspiGPIOHandle(RaspiIOHandle):
     IO_RES = set()
     PATH = __name__.split('.')[-1]
     CATCH_EXCEPTIONS = (ValueError, TypeError, IOError, RuntimeError)
 
+    # GPIO port backends in preferred order, first available one is used
+    PORT_BACKENDS = (GPIOMemPortBackend, GPIOLibPortBackend)
+
+    # Edge events are queued per channel and pushed to client, oldest events of a channel are dropped (and
+    # counted) when its queue is full, subscribe queue_depth 0 means this default depth
+    EVENT_QUEUE_DEPTH = 256
+
     def __init__(self):
         super(RaspiIOHandle, self).__init__()
         GPIO.setwarnings(False)
+        self.__port = None
         self.__io_res = set()
         self.__pwm_list = dict()
         self.__spi_list = dict()
+        self.__spi_engines = dict()
+        self.__loop = None
+        self.__event_flush = None
+        self.__event_overflow = 0
+        self.__event_channels = dict()
+        self.__events = dict()
+
+    def shutdown(self):
+        # RPi.GPIO callback list references this instance, edge detection must be removed explicitly
+        for channel in self.__event_channels:
+            GPIO.remove_event_detect(channel)
+
+        self.__event_channels.clear()
+        self.__events.clear()
+        if self.__event_flush is not None:
+            self.__event_flush.cancel()
+
+        # Pwm channels are driven by port backend, remove them before port is closed
+        for backend, channel in self.__pwm_list.values():
+            GPIOSoftPWMScheduler.get_instance().remove(backend, channel)
+
+        self.__pwm_list.clear()
+        if self.__port is not None:
+            self.__port.close()
+            self.__port = None
 
-    def __del__(self):
-        [pwm.stop() for pwm in self.__pwm_list.values()]
         GPIO.cleanup(list(self.__io_res))
         self.release_gpio(self.__io_res)
 
+        super(RaspiGPIOHandle, self).shutdown()
+
     @staticmethod
     def get_nodes():
         return [RaspiGPIOHandle.PATH]
@@ -62,11 +158,11 @@ class RaspiGPIOHandle(RaspiIOHandle):
                 self.__io_res.remove(gpio)
 
     async def setmode(self, ws, data):
-        data = GPIOMode(**data)
+        data = self.decode_request(GPIOMode, data)
         GPIO.setmode(data.mode)
 
     async def setup(self, ws, data):
-        data = GPIOSetup(**data)
+        data = self.decode_request(GPIOSetup, data)
 
         # Make sure, channel is not be occupied
         self.check_gpio(data.channel)
@@ -81,20 +177,219 @@ class RaspiGPIOHandle(RaspiIOHandle):
         self.register_gpio(data.channel)
 
     async def cleanup(self, ws, data):
-        data = GPIOCleanup(**data)
+        data = self.decode_request(GPIOCleanup, data)
         GPIO.cleanup(data.channel)
         self.release_gpio(data.channel)
 
+        # Cleanup also removes edge detection
+        for channel in data.channel if isinstance(data.channel, (tuple, list)) else [data.channel]:
+            self.__event_channels.pop(channel, None)
+            self.__events.pop(channel, None)
+
     async def output(self, ws, data):
-        data = GPIOCtrl(**data)
+        data = self.decode_request(GPIOCtrl, data)
         GPIO.output(data.channel, data.value)
 
     async def input(self, ws, data):
-        data = GPIOChannel(**data)
+        data = self.decode_request(GPIOChannel, data)
         return GPIO.input(data.channel)
 
-    async def pwm_init(self, ws, data):
-        pwm = GPIOSoftPWM(**data)
+    async def subscribe(self, ws, data):
+        """Subscribe channel edge events, events are pushed to client as
+        {"handle": "event", "events": [{"channel": .., "level": .., "timestamp": ..}, ...], "overflow": n}
+        events happened while previous push sending are coalesced into one push
+
+        :param ws: websocket
+        :param data: GPIOEventSubscribe
+        :return:
+        """
+        sub = self.decode_request(GPIOEventSubscribe, data)
+        if sub.channel not in self.__io_res:
+            raise IOError("Channel:{} is not setup".format(sub.channel))
+
+        if sub.edge not in (GPIO.RISING, GPIO.FALLING, GPIO.BOTH):
+            raise ValueError("Invalid edge:{!r}".format(sub.edge))
+
+        if not isinstance(sub.queue_depth, int) or sub.queue_depth < 0:
+            raise ValueError("Invalid queue depth:{!r}".format(sub.queue_depth))
+
+        # Queue depth only applies to this channel, queued events of this channel are kept
+        depth = self.EVENT_QUEUE_DEPTH if sub.queue_depth == 0 else sub.queue_depth
+        self.__events[sub.channel] = collections.deque(self.__events.get(sub.channel, ()), maxlen=depth)
+
+        if sub.channel in self.__event_channels:
+            GPIO.remove_event_detect(sub.channel)
+            self.__event_channels.pop(sub.channel)
+
+        # Debounce is done by RPi.GPIO, zero means disabled
+        kwargs = dict(callback=functools.partial(self.edge_detected, sub.edge))
+        if sub.bouncetime:
+            kwargs['bouncetime'] = sub.bouncetime
+
+        self.__loop = asyncio.get_event_loop()
+        GPIO.add_event_detect(sub.channel, sub.edge, **kwargs)
+        self.__event_channels[sub.channel] = sub.edge
+
+    async def unsubscribe(self, ws, data):
+        unsub = self.decode_request(GPIOEventUnsubscribe, data)
+        if self.__event_channels.pop(unsub.channel, None) is not None:
+            GPIO.remove_event_detect(unsub.channel)
+
+        self.__events.pop(unsub.channel, None)
+
+    def edge_detected(self, edge, channel):
+        """RPi.GPIO edge detection callback, called on RPi.GPIO thread
+
+        :param edge: subscribed edge
+        :param channel: edge channel
+        :return:
+        """
+        timestamp = time.time()
+        level = GPIO.input(channel) if edge == GPIO.BOTH else int(edge == GPIO.RISING)
+        try:
+            self.__loop.call_soon_threadsafe(self.queue_event, dict(channel=channel, level=level, timestamp=timestamp))
+        except RuntimeError:
+            # Event loop is closed
+            pass
+
+    def queue_event(self, event):
+        # Channel is unsubscribed after event detected
+        events = self.__events.get(event['channel'])
+        if events is None:
+            return
+
+        if len(events) == events.maxlen:
+            self.__event_overflow += 1
+
+        events.append(event)
+        if self.__event_flush is None or self.__event_flush.done():
+            self.__event_flush = asyncio.ensure_future(self.flush_events())
+
+    async def flush_events(self):
+        """Push queued events, client disconnected (session kept) events are pushed after next event"""
+        while any(self.__events.values()) and self.is_connected():
+            events = sorted(itertools.chain(*self.__events.values()), key=lambda event: event['timestamp'])
+            overflow = self.__event_overflow
+            for queue in self.__events.values():
+                queue.clear()
+
+            self.__event_overflow = 0
+
+            try:
+                await self.send_push(GPIOEventPush(handle=GPIOEventPush._handle, events=events, overflow=overflow))
+            except websockets.ConnectionClosed:
+                break
+
+    def get_port(self, mask):
+        """Get GPIO port backend, port channels are BCM numbers and must be setup by this client
+
+        :param mask: port channels mask
+        :return: GPIOPortBackend
+        """
+        if not isinstance(mask, int) or mask < 0 or mask >> GPIOPortBackend.PORT_WIDTH:
+            raise ValueError("Invalid port mask:{!r}".format(mask))
+
+        if GPIO.getmode() != GPIO.BCM:
+            raise ValueError("GPIO port require BCM mode")
+
+        for channel in GPIOPortBackend.channels(mask):
+            if channel not in self.__io_res:
+                raise IOError("Channel:{} is not setup".format(channel))
+
+        return self.get_port_backend()
+
+    def get_port_backend(self):
+        """Get GPIO port backend, hardware register backends address BCM channels, other modes use RPi.GPIO
+
+        :return: GPIOPortBackend
+        """
+        if GPIO.getmode() != GPIO.BCM:
+            return GPIOLibPortBackend(GPIO)
+
+        if self.__port is None:
+            self.__port = get_port_backend(GPIO, self.PORT_BACKENDS)
+
+        return self.__port
+
+    async def output_port(self, ws, data):
+        """Drive port channels in one call, channels mask bit set in value are set, others are cleared
+
+        :param ws: websocket
+        :param data: GPIOPortCtrl
+        :return:
+        """
+        port = self.decode_request(GPIOPortCtrl, data)
+        if not isinstance(port.value, int):
+            raise TypeError("Port value type error")
+
+        self.get_port(port.mask).write(port.mask & port.value, port.mask & ~port.value)
+
+    async def input_port(self, ws, data):
+        """Sample port channels in one call
+
+        :param ws: websocket
+        :param data: GPIOPortSample
+        :return: channels level mask and sample timestamp
+        """
+        port = self.decode_request(GPIOPortSample, data)
+        backend = self.get_port(port.mask)
+        timestamp = time.time()
+        return dict(value=backend.read(port.mask), timestamp=timestamp)
+
+    @staticmethod
+    def get_capture_trigger(trigger, mask):
+        """Get logic analyzer trigger from request trigger
+
+        :param trigger: None, edge {"channel": 17, "edge": GPIO.RISING} or pattern {"mask": .., "value": ..}
+        :param mask: captured channels mask, trigger channels must be captured
+        :return: GPIOLogicAnalyzer trigger (mask, value, edge)
+        """
+        if trigger is None:
+            return None
+
+        if not isinstance(trigger, dict):
+            raise ValueError("Invalid trigger:{!r}".format(trigger))
+
+        if 'channel' in trigger:
+            bit = 1 << trigger['channel']
+            edge = trigger.get('edge')
+            if edge not in (GPIO.RISING, GPIO.FALLING, GPIO.BOTH):
+                raise ValueError("Invalid edge:{!r}".format(edge))
+
+            condition = {GPIO.RISING: (bit, bit, bit), GPIO.FALLING: (bit, 0, bit), GPIO.BOTH: (0, 0, bit)}[edge]
+        else:
+            condition = (trigger.get('mask', 0), trigger.get('value', 0), 0)
+
+        if not all(isinstance(x, int) for x in condition) or (condition[0] | condition[2]) & ~mask:
+            raise ValueError("Trigger channels must be captured:{!r}".format(trigger))
+
+        return condition
+
+    async def capture(self, ws, data):
+        """Logic analyzer capture, sample port channels at rate (Hz, 0 as fast as possible) until trigger,
+        keep pre samples before trigger and post samples from trigger
+
+        Samples are streamed as run length encoded binary (header, slices, trailer), each record is
+        (level mask, run length) little endian u32, then ack returns capture info
+
+        :param ws: websocket
+        :param data: GPIOCapture
+        :return: dict(rate, samples, trigger, timestamp), achieved rate, samples count, trigger sample index
+        """
+        cap = self.decode_request(GPIOCapture, data)
+        trigger = self.get_capture_trigger(cap.trigger, cap.mask)
+        analyzer = GPIOLogicAnalyzer(self.get_port(cap.mask), cap.mask, cap.rate, cap.pre, cap.post, trigger, cap.timeout)
+
+        # Sampling and encoding are blocking, run on device executor
+        samples, info = await self.run_blocking(analyzer.capture)
+        encoded = await self.run_blocking(analyzer.encode, samples)
+
+        await self.send_binary_stream(ws, len(encoded), lambda offset, size: encoded[offset: offset + size],
+                                      GPIOLogicAnalyzer.RLE_FORMAT)
+        return info
+
+    def pwm_init(self, ws, data):
+        pwm = self.decode_request(GPIOSoftPWM, data)
         if not isinstance(pwm.channel, int):
             raise TypeError("Pwm channel type error")
 
@@ -105,22 +400,46 @@ class RaspiGPIOHandle(RaspiIOHandle):
         GPIO.setmode(pwm.mode)
         self.check_gpio(pwm.channel)
         GPIO.setup(pwm.channel, GPIO.OUT)
-        self.__pwm_list[pwm_uuid] = GPIO.PWM(pwm.channel, pwm.frequency)
+
+        # Channel initialized again (e.g. with another frequency) replaces its previous pwm
+        scheduler = GPIOSoftPWMScheduler.get_instance()
+        for previous in [key for key, (_, channel) in self.__pwm_list.items() if channel == pwm.channel]:
+            scheduler.remove(*self.__pwm_list.pop(previous))
+
+        # All soft pwm channels are driven by one scheduler thread, keyed by this client port backend
+        backend = self.get_port_backend()
+        scheduler.add(backend, pwm.channel, pwm.frequency)
+        self.__pwm_list[pwm_uuid] = (backend, pwm.channel)
         self.register_gpio(pwm.channel)
 
-    async def pwm_ctrl(self, ws, data):
-        ctrl = GPIOSoftPWMCtrl(**data)
+    def get_pwm_channel(self, pwm_uuid):
+        """Get pwm (backend, channel) scheduler key"""
+        key = self.__pwm_list.get(pwm_uuid)
+        if key is None:
+            raise ValueError("Do not found pwm:{}".format(pwm_uuid))
+
+        return key
+
+    def pwm_ctrl(self, ws, data):
+        ctrl = self.decode_request(GPIOSoftPWMCtrl, data)
+
+        # Start, update or stop pwm without restarting, duty == 0 stop pwm, optional frequency change frequency
+        backend, channel = self.get_pwm_channel(ctrl.uuid)
+        GPIOSoftPWMScheduler.get_instance().update(backend, channel, ctrl.duty, data.get('frequency'))
 
-        # Get pwm instance
-        pwm = self.__pwm_list.get(ctrl.uuid)
-        if not isinstance(pwm, GPIO.PWM):
-            raise ValueError("Do not found pwm:{}".format(ctrl.uuid))
+    async def pwm_stats(self, ws, data):
+        """Get soft pwm channel statistic
 
-        # Start or stop pwm, duty == 0 stop pwm
-        pwm.start(ctrl.duty) if ctrl.duty else pwm.stop()
+        :param ws: websocket
+        :param data: GPIOSoftPWMStats
+        :return: frequency, duty, edges count, missed periods, edge jitter mean and max in seconds
+        """
+        stats = self.decode_request(GPIOSoftPWMStats, data)
+        backend, channel = self.get_pwm_channel(stats.uuid)
+        return GPIOSoftPWMScheduler.get_instance().stats(backend, channel)
 
     async def spi_init(self, ws, data):
-        spi = GPIOSoftSPI(**data)
+        spi = self.decode_request(GPIOSoftSPI, data)
 
         # Get pwm instance uuid
         spi_uuid = spi.generate_uuid()
@@ -134,97 +453,45 @@ class RaspiGPIOHandle(RaspiIOHandle):
 
         # Register spi to spi device list
         self.__spi_list[spi_uuid] = spi
+        self.__spi_engines.pop(spi_uuid, None)
 
-    async def spi_xfer(self, ws, data):
-        xfer = GPIOSoftSPIXfer(**data)
-
-        # Get spi instance
-        spi = self.__spi_list.get(xfer.uuid)
-        if not isinstance(spi, GPIOSoftSPI):
-            raise ValueError("Do not found spi:{}".format(xfer.uuid))
-
-        read_bytes = list()
-        shift_mask = (1 << (spi.bits_per_word - 1))
-        word_mask = 0xffffffffffffffff >> (64 - spi.bits_per_word)
-
-        # SPI bus init
-        GPIO.output(spi.cs, 1)
-        GPIO.output([spi.cs, spi.clk, spi.mosi], 0)
-
-        # Write data to spi
-        for word in xfer.data:
-            word &= word_mask
-            for i in range(spi.bits_per_word):
-                GPIO.output(spi.clk, 0)
-                GPIO.output(spi.mosi, 1 if word & shift_mask else 0)
-                GPIO.output(spi.clk, 1)
-                word = (word << 1) & word_mask
-
-        # Read data back
-        for n in range(xfer.size):
-            word = 0x0
-            for i in range(spi.bits_per_word):
-                GPIO.output(spi.clk, 0)
-                bit = GPIO.input(spi.miso) & 1
-                word |= (bit << (spi.bits_per_word - 1 - i))
-                GPIO.output(spi.clk, 1)
-
-            read_bytes.append(word)
-
-        return read_bytes
-
-    async def spi_read(self, ws, data):
-        read = GPIOSoftSPIRead(**data)
-
-        # Get spi instance
-        spi = self.__spi_list.get(read.uuid)
-        if not isinstance(spi, GPIOSoftSPI):
-            raise ValueError("Do not found spi:{}".format(read.uuid))
-
-        # SPI bus init
-        read_bytes = list()
-        GPIO.output(spi.cs, 1)
-        GPIO.output([spi.cs, spi.clk, spi.mosi], 0)
+    def get_spi_engine(self, spi_uuid):
+        """Get soft spi bit-bang engine, engine is created when it is first used
 
-        # Read data back
-        for n in range(read.size):
-            word = 0x0
-            for i in range(spi.bits_per_word):
-                GPIO.output(spi.clk, 0)
-                bit = GPIO.input(spi.miso) & 1
-                word |= (bit << (spi.bits_per_word - 1 - i))
-                GPIO.output(spi.clk, 1)
+        :param spi_uuid: soft spi uuid
+        :return: GPIOSoftSPIEngine
+        """
+        engine = self.__spi_engines.get(spi_uuid)
+        if engine is not None:
+            return engine
 
-            read_bytes.append(word)
+        spi = self.__spi_list.get(spi_uuid)
+        if not isinstance(spi, GPIOSoftSPI):
+            raise ValueError("Do not found spi:{}".format(spi_uuid))
 
-        return read_bytes
+        engine = self.__spi_engines[spi_uuid] = GPIOSoftSPIEngine(spi, self.get_port_backend())
+        return engine
 
-    async def spi_write(self, ws, data):
-        write = GPIOSoftSPIWrite(**data)
+    def spi_xfer(self, ws, data):
+        xfer = self.decode_request(GPIOSoftSPIXfer, data)
+        return self.get_spi_engine(xfer.uuid).transfer(xfer.data, xfer.size)
 
-        # Get spi instance
-        spi = self.__spi_list.get(write.uuid)
-        if not isinstance(spi, GPIOSoftSPI):
-            raise ValueError("Do not found spi:{}".format(write.uuid))
+    def spi_read(self, ws, data):
+        read = self.decode_request(GPIOSoftSPIRead, data)
+        return self.get_spi_engine(read.uuid).transfer([], read.size)
 
-        # TODO: Move to GPIOSoftSPI class
-        shift_mask = (1 << (spi.bits_per_word - 1))
-        word_mask = 0xffffffffffffffff >> (64 - spi.bits_per_word)
+    def spi_write(self, ws, data):
+        write = self.decode_request(GPIOSoftSPIWrite, data)
 
-        # SPI bus init
-        GPIO.output(spi.cs, 1)
-        GPIO.output([spi.cs, spi.clk, spi.mosi], 0)
+        # LSB Strobe
+        self.get_spi_engine(write.uuid).transfer(write.data, 0, strobe=True)
 
-        # Write data to spi
-        for word in write.data:
-            word &= word_mask
-            for i in range(spi.bits_per_word):
-                GPIO.output(spi.clk, 0)
-                GPIO.output(spi.mosi, 1 if word & shift_mask else 0)
+    async def spi_stats(self, ws, data):
+        """Get soft spi transfers statistic
 
-                # LSB Strobe
-                if i == spi.bits_per_word - 1:
-                    GPIO.output(spi.cs, 1)
-
-                GPIO.output(spi.clk, 1)
-                word = (word << 1) & word_mask
+        :param ws: websocket
+        :param data: GPIOSoftSPIStats
+        :return: transfers, bits, seconds and achieved clock rate (sclk, last_sclk) in Hz
+        """
+        stats = self.decode_request(GPIOSoftSPIStats, data)
+        return self.get_spi_engine(stats.uuid).stats
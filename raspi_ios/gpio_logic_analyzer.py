@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import time
+import array
+__all__ = ['GPIOLogicAnalyzer']
+
+
+class GPIOLogicAnalyzer(object):
+    """Sample GPIO port channels at a fixed rate to an array buffer, with trigger and pre/post trigger depth
+
+    Trigger is (mask, value, edge): fires on sample which (sample & mask) == value and edge channels changed
+    since previous sample, e.g. rising edge of channel bit b is (b, b, b), falling is (b, 0, b),
+    both is (0, 0, b), pattern is (mask, value, 0), None triggers on first sample
+    """
+    # Run length encoded capture: records of (level, run length) little endian u32
+    RLE_FORMAT = 'rle32'
+    RLE_TYPE = 'I'
+    MAX_RUN = 0xffffffff
+
+    # Samples buffer limit (each side of trigger), 4 bytes per sample
+    MAX_DEPTH = 4 * 1024 * 1024
+
+    # Capture busy-spins device thread and can not be cancelled, sampling duration ((pre + post) / rate)
+    # and trigger timeout are bounded in seconds
+    MAX_DURATION = 10.0
+
+    def __init__(self, backend, mask, rate, pre=0, post=1024, trigger=None, timeout=1.0):
+        if not isinstance(rate, (int, float)) or rate < 0:
+            raise ValueError("Invalid sample rate:{!r}".format(rate))
+
+        # Post trigger depth includes trigger sample
+        for depth, minimum in ((pre, 0), (post, 1)):
+            if not isinstance(depth, int) or depth < minimum or depth > self.MAX_DEPTH:
+                raise ValueError("Invalid capture depth:{!r}".format(depth))
+
+        if trigger is not None and (len(trigger) != 3 or not all(isinstance(x, int) for x in trigger)):
+            raise ValueError("Invalid trigger:{!r}".format(trigger))
+
+        if rate and (pre + post) / rate > self.MAX_DURATION:
+            raise ValueError("Capture duration exceeds {}s: {!r} samples at {!r}Hz".format(
+                self.MAX_DURATION, pre + post, rate))
+
+        if not isinstance(timeout, (int, float)) or not 0 < timeout <= self.MAX_DURATION:
+            raise ValueError("Invalid trigger timeout:{!r}".format(timeout))
+
+        self.__mask = mask
+        self.__pre = pre
+        self.__post = post
+        self.__backend = backend
+        self.__trigger = trigger
+        self.__timeout = timeout
+        self.__period = 1.0 / rate if rate else 0.0
+
+    def capture(self):
+        """Wait trigger and capture samples, blocking
+
+        :return: samples array and capture info dict(rate, samples, trigger, timestamp), trigger is trigger sample index
+        """
+        mask, pre, period = self.__mask, self.__pre, self.__period
+        read = self.__backend.read
+        clock = time.perf_counter
+
+        # Pre trigger samples are kept in a ring, index is total samples count
+        ring = array.array(self.RLE_TYPE, bytes(4 * pre))
+        count = 0
+
+        if self.__trigger is None:
+            trigger_mask, trigger_value, edge = 0, 0, 0
+        else:
+            trigger_mask, trigger_value, edge = self.__trigger
+
+        start = clock()
+        deadline = start + self.__timeout
+        previous = sample = read(mask)
+
+        # Wait trigger, edge trigger requires a previous sample
+        while (sample & trigger_mask) != trigger_value or (edge and not (sample ^ previous) & edge):
+            if pre:
+                ring[count % pre] = sample
+            count += 1
+
+            next_sample = start + count * period
+            now = clock()
+            if now > deadline:
+                raise TimeoutError("Capture trigger timeout")
+
+            while now < next_sample:
+                now = clock()
+
+            previous, sample = sample, read(mask)
+
+        timestamp = time.time()
+        trigger_time = clock()
+
+        # Post trigger samples, trigger sample is the first one
+        post = array.array(self.RLE_TYPE, [sample])
+        append = post.append
+        for n in range(1, self.__post):
+            next_sample = trigger_time + n * period
+            while clock() < next_sample:
+                pass
+
+            append(read(mask))
+
+        elapsed = clock() - trigger_time
+
+        # Unroll pre trigger ring, oldest sample first
+        kept = min(count, pre)
+        position = count % pre if pre else 0
+        samples = ring[position:] + ring[:position] if kept == pre else ring[:kept]
+        samples.extend(post)
+        rate = (len(post) - 1) / elapsed if elapsed and len(post) > 1 else 0.0
+        info = dict(rate=rate, samples=len(samples), trigger=kept, timestamp=timestamp)
+        return samples, info
+
+    @classmethod
+    def encode(cls, samples):
+        """Run length encode samples, idle signals collapse to one record
+
+        :param samples: samples array
+        :return: bytes, records of (level, run length)
+        """
+        records = array.array(cls.RLE_TYPE)
+        if not samples:
+            return records.tobytes()
+
+        level, run = samples[0], 0
+        for sample in samples:
+            if sample == level and run < cls.MAX_RUN:
+                run += 1
+                continue
+
+            records.append(level)
+            records.append(run)
+            level, run = sample, 1
+
+        records.append(level)
+        records.append(run)
+        return records.tobytes()
+
+    @classmethod
+    def decode(cls, data):
+        """Run length decode, reverse of encode
+
+        :param data: encoded bytes
+        :return: samples array
+        """
+        records = array.array(cls.RLE_TYPE)
+        records.frombytes(data)
+        samples = array.array(cls.RLE_TYPE)
+        for i in range(0, len(records), 2):
+            samples.extend(array.array(cls.RLE_TYPE, [records[i]]) * records[i + 1])
+
+        return samples
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+import os
+import mmap
+import struct
+__all__ = ['GPIOPortBackend', 'GPIOMemPortBackend', 'GPIOLibPortBackend', 'get_port_backend']
+
+
+class GPIOPortBackend(object):
+    """GPIO port (bank 0, BCM GPIO0 - GPIO31) backend, channels are bits of a 32 bits mask"""
+    NAME = ""
+    PORT_WIDTH = 32
+
+    # Backend access hardware registers directly, bypass RPi.GPIO (and simulated backend)
+    HARDWARE = False
+
+    @classmethod
+    def is_available(cls):
+        return False
+
+    @staticmethod
+    def channels(mask):
+        return [channel for channel in range(mask.bit_length()) if mask & (1 << channel)]
+
+    def write(self, set_mask, clear_mask):
+        """Drive set_mask channels high and clear_mask channels low
+
+        :param set_mask: channels to be set
+        :param clear_mask: channels to be cleared
+        :return:
+        """
+        pass
+
+    def read(self, mask):
+        """Sample channels level
+
+        :param mask: channels to be sampled
+        :return: level bitmask
+        """
+        return 0
+
+    def compile_edge(self, set_mask, clear_mask):
+        """Compile an edge to backend representation, it is executed by execute
+
+        :param set_mask: channels to be set
+        :param clear_mask: channels to be cleared
+        :return: compiled edge
+        """
+        return set_mask, clear_mask
+
+    def execute(self, sequence, sample_mask):
+        """Execute compiled edge sequence, None in sequence samples sample_mask channels
+
+        :param sequence: iterable of compiled edge or None
+        :param sample_mask: channels to be sampled
+        :return: sampled levels list
+        """
+        levels = list()
+        for edge in sequence:
+            if edge is None:
+                levels.append(self.read(sample_mask))
+            else:
+                self.write(*edge)
+
+        return levels
+
+    def close(self):
+        pass
+
+
+class GPIOMemPortBackend(GPIOPortBackend):
+    """Memory mapped /dev/gpiomem, one register write set (clear) all channels, one register read samples all"""
+    NAME = 'gpiomem'
+    HARDWARE = True
+    DEVICE = '/dev/gpiomem'
+    BLOCK_SIZE = 4096
+
+    # BCM283x GPIO registers offset
+    GPSET0 = 0x1c
+    GPCLR0 = 0x28
+    GPLEV0 = 0x34
+    REGISTER = struct.Struct('<I')
+
+    def __init__(self, gpio=None):
+        fd = os.open(self.DEVICE, os.O_RDWR | os.O_SYNC)
+        try:
+            self.__mem = mmap.mmap(fd, self.BLOCK_SIZE, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        finally:
+            os.close(fd)
+
+        # Registers as 32 bits words, item assignment is much faster than struct pack
+        self.__registers = memoryview(self.__mem).cast('I')
+
+    @classmethod
+    def is_available(cls):
+        return os.access(cls.DEVICE, os.R_OK | os.W_OK)
+
+    def write(self, set_mask, clear_mask):
+        if set_mask:
+            self.REGISTER.pack_into(self.__mem, self.GPSET0, set_mask)
+
+        if clear_mask:
+            self.REGISTER.pack_into(self.__mem, self.GPCLR0, clear_mask)
+
+    def read(self, mask):
+        return self.__registers[self.GPLEV0 // 4] & mask
+
+    def execute(self, sequence, sample_mask):
+        levels = list()
+        sample = levels.append
+        registers = self.__registers
+        gpset, gpclr, gplev = self.GPSET0 // 4, self.GPCLR0 // 4, self.GPLEV0 // 4
+
+        for edge in sequence:
+            if edge is None:
+                sample(registers[gplev] & sample_mask)
+                continue
+
+            # Clear first, data line changes after clock falling edge
+            set_mask, clear_mask = edge
+            if clear_mask:
+                registers[gpclr] = clear_mask
+
+            if set_mask:
+                registers[gpset] = set_mask
+
+        return levels
+
+    def close(self):
+        self.__registers.release()
+        self.__mem.close()
+
+
+class GPIOLibPortBackend(GPIOPortBackend):
+    """RPi.GPIO fallback, channels are written and sampled one by one (not coherent), channels are numbered
+    by current GPIO mode"""
+    NAME = 'RPi.GPIO'
+
+    def __init__(self, gpio):
+        self.__gpio = gpio
+
+    @classmethod
+    def is_available(cls):
+        return True
+
+    def write(self, set_mask, clear_mask):
+        channels = self.channels(set_mask | clear_mask)
+        if channels:
+            self.__gpio.output(channels, [1 if set_mask & (1 << channel) else 0 for channel in channels])
+
+    def read(self, mask):
+        level = 0
+        for channel in self.channels(mask):
+            level |= (self.__gpio.input(channel) & 1) << channel
+
+        return level
+
+    def compile_edge(self, set_mask, clear_mask):
+        # One RPi.GPIO output call drives all edge channels, cleared channels first
+        channels = self.channels(clear_mask) + self.channels(set_mask)
+        return channels, [0 if clear_mask & (1 << channel) else 1 for channel in channels]
+
+    def execute(self, sequence, sample_mask):
+        levels = list()
+        sample = levels.append
+        output, read = self.__gpio.output, self.__gpio.input
+        channels = self.channels(sample_mask)
+        single = channels[0] if len(channels) == 1 else None
+
+        for edge in sequence:
+            if edge is None:
+                sample(read(single) if single is not None else self.read(sample_mask))
+            else:
+                output(*edge)
+
+        return levels
+
+
+def get_port_backend(gpio, backends=(GPIOMemPortBackend, GPIOLibPortBackend)):
+    """Get first available GPIO port backend
+
+    :param gpio: RPi.GPIO module, used by fallback backend
+    :param backends: backend classes in preferred order
+    :return: GPIOPortBackend instance
+    """
+    for backend in backends:
+        if backend.is_available():
+            return backend(gpio)
+
+    raise RuntimeError("Do not found available GPIO port backend")
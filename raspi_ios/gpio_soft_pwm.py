@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+import time
+import threading
+__all__ = ['GPIOSoftPWMChannel', 'GPIOSoftPWMScheduler']
+
+
+class GPIOSoftPWMChannel(object):
+    """Soft PWM channel schedule state, next edge is (next_time, next_level), None when channel is constant"""
+
+    def __init__(self, channel, backend, frequency):
+        self.bit = 1 << channel
+        self.backend = backend
+        self.frequency = frequency
+        self.duty = 0.0
+
+        # Duty and frequency updates are applied at next period start, do not truncate current period
+        self.pending = None
+        self.period_start = 0.0
+        self.next_time = None
+        self.next_level = 0
+
+        self.edges = 0
+        self.missed = 0
+        self.jitter_sum = 0.0
+        self.jitter_max = 0.0
+
+    @property
+    def constant(self):
+        return self.duty <= 0 or self.duty >= 100
+
+    @property
+    def stats(self):
+        """Edges count, missed periods, edge jitter mean and max in seconds"""
+        return dict(frequency=self.frequency, duty=self.duty, edges=self.edges, missed=self.missed,
+                    jitter_mean=self.jitter_sum / self.edges if self.edges else 0.0, jitter_max=self.jitter_max)
+
+    def start_period(self, start):
+        """Start a period at start, apply pending update
+
+        :param start: period start time
+        :return: period start level
+        """
+        if self.pending is not None:
+            self.frequency, self.duty = self.pending
+            self.pending = None
+
+        self.period_start = start
+        if self.constant:
+            self.next_time = None
+            return 1 if self.duty >= 100 else 0
+
+        self.next_time = start + self.duty / 100.0 / self.frequency
+        self.next_level = 0
+        return 1
+
+    def end_high(self, now):
+        """High level is over, schedule next period start, skip periods already passed
+
+        :param now: current time
+        :return:
+        """
+        period = 1.0 / self.frequency
+        start = self.period_start + period
+        if start < now:
+            skipped = int((now - start) / period) + 1
+            self.missed += skipped
+            start += skipped * period
+
+        self.next_time = start
+        self.next_level = 1
+
+
+class GPIOSoftPWMScheduler(object):
+    """Single thread soft PWM scheduler, all channels edges are merged into one schedule
+
+    Edges due within MERGE_WINDOW are written in one port backend write, scheduler sleeps until SPIN_TIME before
+    next edge then spins, jitter is bounded by Python thread switch (GIL) on a busy process. Scheduler is shared
+    by all handles of the process, channels are keyed by (backend, channel), channel is numbered as its backend
+    """
+    SPIN_TIME = 0.0002
+    MERGE_WINDOW = 0.00002
+
+    # Backend write errors (e.g. closed backend), channels of failed backend are dropped, others keep running
+    WRITE_ERRORS = (TypeError, ValueError, OSError, RuntimeError)
+
+    __instance = None
+    __instance_lock = threading.Lock()
+
+    def __init__(self):
+        self.__channels = dict()
+        self.__cond = threading.Condition()
+        self.__thread = threading.Thread(target=self.run, name="soft-pwm", daemon=True)
+        self.__thread.start()
+
+    @classmethod
+    def get_instance(cls):
+        """Get scheduler, scheduler thread is started on first use
+
+        :return: GPIOSoftPWMScheduler
+        """
+        with cls.__instance_lock:
+            if cls.__instance is None:
+                cls.__instance = cls()
+
+            return cls.__instance
+
+    @staticmethod
+    def check(frequency, duty):
+        if not isinstance(frequency, (int, float)) or frequency <= 0:
+            raise ValueError("Invalid pwm frequency:{!r}".format(frequency))
+
+        if not isinstance(duty, (int, float)) or not 0 <= duty <= 100:
+            raise ValueError("Invalid pwm duty:{!r}".format(duty))
+
+    def add(self, backend, channel, frequency):
+        """Add a stopped channel, channel already added is replaced
+
+        :param backend: GPIOPortBackend drive channel
+        :param channel: GPIO channel, numbered as backend
+        :param frequency: PWM frequency in Hz
+        :return:
+        """
+        self.check(frequency, 0)
+        with self.__cond:
+            self.remove(backend, channel)
+            self.__channels[(backend, channel)] = GPIOSoftPWMChannel(channel, backend, frequency)
+
+    def remove(self, backend, channel):
+        """Remove channel, channel is left low
+
+        :param backend: GPIOPortBackend drive channel
+        :param channel: GPIO channel
+        :return:
+        """
+        with self.__cond:
+            pwm = self.__channels.pop((backend, channel), None)
+            if pwm is None:
+                return
+
+            self.__cond.notify()
+            try:
+                pwm.backend.write(0, pwm.bit)
+            except self.WRITE_ERRORS as err:
+                print("Soft pwm channel:{} stop error: {}".format(channel, err))
+
+    def update(self, backend, channel, duty, frequency=None):
+        """Update channel duty and frequency without restarting, duty 0 stops channel
+
+        :param backend: GPIOPortBackend drive channel
+        :param channel: GPIO channel
+        :param duty: duty cycle 0 - 100
+        :param frequency: PWM frequency in Hz, None keep current frequency
+        :return:
+        """
+        with self.__cond:
+            pwm = self.get_channel(backend, channel)
+            frequency = pwm.frequency if frequency is None else frequency
+            self.check(frequency, duty)
+
+            # Running channel applies update at next period, constant channel starts a new period right now
+            pwm.pending = (frequency, duty)
+            if pwm.next_time is None:
+                level = pwm.start_period(time.perf_counter())
+                pwm.backend.write(pwm.bit if level else 0, 0 if level else pwm.bit)
+
+            self.__cond.notify()
+
+    def get_channel(self, backend, channel):
+        pwm = self.__channels.get((backend, channel))
+        if pwm is None:
+            raise ValueError("Do not found pwm channel:{}".format(channel))
+
+        return pwm
+
+    def stats(self, backend, channel):
+        with self.__cond:
+            return self.get_channel(backend, channel).stats
+
+    def next_edge(self):
+        times = [pwm.next_time for pwm in self.__channels.values() if pwm.next_time is not None]
+        return min(times) if times else None
+
+    def run(self):
+        clock = time.perf_counter
+        while True:
+            with self.__cond:
+                deadline = self.next_edge()
+                if deadline is None:
+                    self.__cond.wait()
+                    continue
+
+                # Sleep most of the time, updates wake scheduler and reschedule
+                timeout = deadline - clock() - self.SPIN_TIME
+                if timeout > 0:
+                    self.__cond.wait(timeout)
+                    continue
+
+            while clock() < deadline:
+                pass
+
+            with self.__cond:
+                self.fire(clock())
+
+    def fire(self, now):
+        """Write all channels edges due before now + MERGE_WINDOW, one write per backend
+
+        :param now: current time
+        :return:
+        """
+        writes = dict()
+        due = now + self.MERGE_WINDOW
+        for pwm in self.__channels.values():
+            if pwm.next_time is None or pwm.next_time > due:
+                continue
+
+            scheduled = pwm.next_time
+            if pwm.next_level:
+                level = pwm.start_period(scheduled)
+            else:
+                level = 0
+                pwm.end_high(now)
+
+            masks = writes.setdefault(pwm.backend, [0, 0])
+            masks[0 if level else 1] |= pwm.bit
+
+            jitter = abs(now - scheduled)
+            pwm.edges += 1
+            pwm.jitter_sum += jitter
+            pwm.jitter_max = max(pwm.jitter_max, jitter)
+
+        for backend, (set_mask, clear_mask) in writes.items():
+            try:
+                backend.write(set_mask, clear_mask)
+            except self.WRITE_ERRORS as err:
+                self.drop_backend(backend, err)
+
+    def drop_backend(self, backend, err):
+        """Drop channels driven by a failed backend, scheduler thread keeps running other channels
+
+        :param backend: failed backend
+        :param err: write error
+        :return:
+        """
+        keys = [key for key, pwm in self.__channels.items() if pwm.backend is backend]
+        for key in keys:
+            self.__channels.pop(key)
+
+        print("Soft pwm channels:{} dropped, backend write error: {}".format([channel for _, channel in keys], err))
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import time
+import itertools
+import collections
+__all__ = ['GPIOSoftSPIEngine']
+
+
+class GPIOSoftSPIEngine(object):
+    """Bit-bang SPI engine
+
+    Transfer is compiled to a port edge sequence (clock falling with data line, clock rising, MISO sampling),
+    word edges are precomputed and cached, sequence is executed by GPIO port backend in one loop. The loop is
+    pure Python and holds the GIL, it runs on GPIO device executor thread so event loop is not blocked
+    """
+    # Recently used word edges cache size, all words of 8 bits (with and without strobe) fit in
+    CACHE_SIZE = 512
+
+    def __init__(self, spi, backend):
+        self.__backend = backend
+        self.__bits = spi.bits_per_word
+        self.__word_mask = (1 << spi.bits_per_word) - 1
+        self.__cs, self.__clk, self.__mosi, self.__miso = (1 << spi.cs, 1 << spi.clk, 1 << spi.mosi, 1 << spi.miso)
+
+        # Bus init: cs high, then cs, clk, mosi low
+        edge = backend.compile_edge
+        self.__start = (edge(self.__cs, 0), edge(0, self.__cs | self.__clk | self.__mosi))
+        self.__data = (edge(self.__mosi, self.__clk), edge(0, self.__clk | self.__mosi))
+        self.__rising = edge(self.__clk, 0)
+        self.__strobe = edge(self.__cs, 0)
+
+        # Read word: clk low, sample MISO, clk high of each bit
+        self.__read = (edge(0, self.__clk), None, self.__rising) * self.__bits
+
+        self.__words = collections.OrderedDict()
+        self.__stats = dict(backend=backend.NAME, transfers=0, bits=0, seconds=0.0, sclk=0.0, last_sclk=0.0)
+
+    @property
+    def stats(self):
+        """Transfers statistic, sclk is achieved clock rate in Hz"""
+        return dict(self.__stats)
+
+    def get_word_edges(self, word, strobe=False):
+        """Get word write edges, MSB first
+
+        :param word: word to write
+        :param strobe: set cs before LSB clock rising
+        :return: edges tuple
+        """
+        key = (word, strobe)
+        edges = self.__words.get(key)
+        if edges is not None:
+            self.__words.move_to_end(key)
+            return edges
+
+        edges = list()
+        for i in range(self.__bits):
+            edges.append(self.__data[0] if word & (1 << (self.__bits - 1 - i)) else self.__data[1])
+            if strobe and i == self.__bits - 1:
+                edges.append(self.__strobe)
+
+            edges.append(self.__rising)
+
+        edges = tuple(edges)
+        self.__words[key] = edges
+        if len(self.__words) > self.CACHE_SIZE:
+            self.__words.popitem(last=False)
+
+        return edges
+
+    def transfer(self, write, read_size, strobe=False):
+        """Write words then read words
+
+        :param write: words to write
+        :param read_size: words to read
+        :param strobe: set cs before each written word LSB clock rising
+        :return: read words list
+        """
+        write = [word & self.__word_mask for word in write]
+        sequence = itertools.chain(
+            self.__start,
+            itertools.chain.from_iterable(self.get_word_edges(word, strobe) for word in write),
+            itertools.chain.from_iterable(itertools.repeat(self.__read, read_size))
+        )
+
+        start = time.perf_counter()
+        levels = self.__backend.execute(sequence, self.__miso)
+        seconds = time.perf_counter() - start
+
+        words = list()
+        for n in range(read_size):
+            word = 0
+            for level in levels[n * self.__bits: (n + 1) * self.__bits]:
+                word = (word << 1) | (1 if level else 0)
+
+            words.append(word)
+
+        bits = (len(write) + read_size) * self.__bits
+        self.__stats['transfers'] += 1
+        self.__stats['bits'] += bits
+        self.__stats['seconds'] += seconds
+        self.__stats['sclk'] = self.__stats['bits'] / self.__stats['seconds'] if self.__stats['seconds'] else 0.0
+        self.__stats['last_sclk'] = bits / seconds if seconds else 0.0
+        return words
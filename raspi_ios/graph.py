@@ -1,5 +1,4 @@
 # -*- coding: utf-8 -*-
-import os
 from .core import RaspiIOHandle
 from .server import register_handle
 from pylibmmal import MmalGraph, LCD, HDMI
@@ -16,40 +15,39 @@ class RaspiMmalGraphHandle(RaspiIOHandle):
     def __init__(self):
         super(RaspiMmalGraphHandle, self).__init__()
 
-    def __del__(self):
+    def shutdown(self):
         try:
             if self.__graph.is_open:
                 self.__graph.close()
         except AttributeError:
             pass
 
+        super(RaspiMmalGraphHandle, self).shutdown()
+
     @staticmethod
     def get_nodes():
         return list(map(str, [LCD, HDMI]))
 
-    async def init(self, ws, data):
-        req = GraphInit(**data)
+    def init(self, ws, data):
+        req = self.decode_request(GraphInit, data)
         self.__graph = MmalGraph(req.display_num)
         return True
 
     async def open(self, ws, data):
-        # Save graph to a temporary file
+        # Save graph to upload cache, cached graph is not uploaded again
         file_path = await self.receive_binary_file(ws, data)
 
         # Display graph via mmal
-        self.__graph.open(file_path)
-
-        # Remove graph
-        os.remove(file_path)
+        await self.run_blocking(self.__graph.open, file_path)
         return True
 
     async def close(self, ws, data):
-        GraphClose(**data)
+        self.decode_request(GraphClose, data)
         if self.__graph.is_open:
             self.__graph.close()
 
     async def get_property(self, ws, data):
-        req = GraphProperty(**data)
+        req = self.decode_request(GraphProperty, data)
         if req.property == GraphProperty.IS_OPEN:
             return self.__graph.is_open
         elif req.property == GraphProperty.DISPLAY_NUM:
@@ -16,34 +16,36 @@ class RaspiI2CHandle(RaspiIOHandle):
         super(RaspiI2CHandle, self).__init__()
         self.__device = None
 
-    def __del__(self):
+    def shutdown(self):
         if isinstance(self.__device, pylibi2c.I2CDevice):
             self.__device.close()
 
+        super(RaspiI2CHandle, self).shutdown()
+
     @staticmethod
     def get_nodes():
         return glob.glob("/dev/i2c-*")
 
     async def open(self, ws, data):
         # Parse request
-        device = I2CDevice(**data).__dict__
+        device = self.decode_request(I2CDevice, data).__dict__
         device.pop("handle")
 
         # First open i2c bus
         self.__device = pylibi2c.I2CDevice(**device)
 
-    async def read(self, ws, data):
-        req = I2CRead(**data)
+    def read(self, ws, data):
+        req = self.decode_request(I2CRead, data)
         if req.is_ioctl_read():
             buf = self.__device.ioctl_read(req.addr, req.size)
         else:
             buf = self.__device.read(req.addr, req.size)
 
-        return self.encode_data(buf)
+        return bytes(buf)
 
-    async def write(self, ws, data):
-        req = I2CWrite(**data)
-        data = self.decode_data(req.data)
+    def write(self, ws, data):
+        req = self.decode_request(I2CWrite, data)
+        data = self.decode_payload(req, req.data)
         if req.is_ioctl_write():
             ret = self.__device.ioctl_write(req.addr, data)
         else:
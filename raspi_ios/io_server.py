@@ -1,10 +1,34 @@
 # -*- coding: utf-8 -*-
-from .server import RaspiIOServer, get_registered_handles
+import os
+import sys
+import argparse
+from . import simulation
+from .server import RaspiIOServer, get_handle_paths
 
 
 if __name__ == "__main__":
-    server = RaspiIOServer()
-    for handle in get_registered_handles():
-        server.register(handle)
+    parser = argparse.ArgumentParser(description="Raspberry pi websocket io server")
+    parser.add_argument("--single-port", action="store_true", help="serve all handles on one port")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics over http on this port")
+    parser.add_argument("--min-workers", type=int, default=1, help="workers keep running when idle")
+    parser.add_argument("--max-workers", type=int, help="max workers, default calculated from device nodes")
+    parser.add_argument("--worker-idle-timeout", type=float, default=60.0, help="seconds before idle worker exit")
+    parser.add_argument("--trusted-clients", action="store_true", help="skip request required properties check")
+    parser.add_argument("--unix-socket", help="also serve local clients on this unix domain socket path")
+    parser.add_argument("--session-timeout", type=float, default=0.0, help="seconds to keep client session alive")
+    parser.add_argument("--backend", choices=("hw", "sim"), help="hardware backend, default hw")
+    args = parser.parse_args()
+
+    # Backend is selected when raspi_ios is imported, restart with environment variable
+    if args.backend and (args.backend == "sim") != simulation.is_enabled():
+        os.environ[simulation.BACKEND_ENV] = args.backend
+        os.execv(sys.executable, [sys.executable, "-m", "raspi_ios.io_server"] + sys.argv[1:])
+
+    server = RaspiIOServer(single_port=args.single_port, metrics_port=args.metrics_port,
+                           min_workers=args.min_workers, max_workers=args.max_workers,
+                           worker_idle_timeout=args.worker_idle_timeout, trusted_clients=args.trusted_clients,
+                           unix_socket=args.unix_socket, session_timeout=args.session_timeout)
+    for path in get_handle_paths():
+        server.register(path)
 
     server.run_forever()
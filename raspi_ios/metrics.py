@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import collections
+__all__ = ['RaspiIOMetrics']
+
+
+class RaspiIOMetrics(object):
+    PREFIX = 'raspi_ios'
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+    LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self.__requests = dict()
+        self.__bytes_in = collections.Counter()
+        self.__bytes_out = collections.Counter()
+        self.__connections = collections.Counter()
+        self.__gauges = dict()
+
+    def reset(self):
+        self.__init__()
+
+    def observe_request(self, path, name, seconds, error=False):
+        """Record a processed request
+
+        :param path: handle path
+        :param name: request name
+        :param seconds: request process time in seconds
+        :param error: request is failed
+        :return:
+        """
+        # [count, errors, sum, bucket0, bucket1, ...]
+        stats = self.__requests.setdefault((path, name), [0, 0, 0.0] + [0] * len(self.LATENCY_BUCKETS))
+        stats[0] += 1
+        stats[1] += 1 if error else 0
+        stats[2] += seconds
+        for i, bound in enumerate(self.LATENCY_BUCKETS):
+            if seconds <= bound:
+                stats[3 + i] += 1
+
+    def observe_bytes(self, path, received=0, sent=0):
+        self.__bytes_in[path] += received
+        self.__bytes_out[path] += sent
+
+    def connection_opened(self, port):
+        self.__connections[port] += 1
+
+    def connection_closed(self, port):
+        self.__connections[port] -= 1
+
+    def set_gauge(self, name, value):
+        self.__gauges[name] = value
+
+    def snapshot(self):
+        """Get a picklable metrics snapshot, workers send it to route process
+
+        :return: dict
+        """
+        return dict(
+            requests={key: list(value) for key, value in self.__requests.items()},
+            bytes_in=dict(self.__bytes_in), bytes_out=dict(self.__bytes_out),
+            connections=dict(self.__connections), gauges=dict(self.__gauges)
+        )
+
+    @classmethod
+    def merge(cls, snapshots):
+        """Merge multi-process metrics snapshots
+
+        :param snapshots: snapshot list
+        :return: merged snapshot
+        """
+        merged = dict(requests=dict(), bytes_in=collections.Counter(), bytes_out=collections.Counter(),
+                      connections=collections.Counter(), gauges=dict())
+
+        for snapshot in snapshots:
+            for key, value in snapshot.get('requests').items():
+                stats = merged['requests'].setdefault(key, [0] * len(value))
+                merged['requests'][key] = [x + y for x, y in zip(stats, value)]
+
+            for name in ('bytes_in', 'bytes_out', 'connections'):
+                merged[name].update(snapshot.get(name))
+
+            merged['gauges'].update(snapshot.get('gauges'))
+
+        return merged
+
+    @classmethod
+    def exposition(cls, snapshot):
+        """Format snapshot as Prometheus text exposition format
+
+        :param snapshot: metrics snapshot
+        :return: str
+        """
+        lines = list()
+        name = "{}_request_latency_seconds".format(cls.PREFIX)
+        lines.append("# TYPE {} histogram".format(name))
+        for (path, request), stats in sorted(snapshot.get('requests').items()):
+            labels = 'path="{}",request="{}"'.format(path, request)
+            for bound, count in zip(cls.LATENCY_BUCKETS, stats[3:]):
+                lines.append('{}_bucket{{{},le="{}"}} {}'.format(name, labels, bound, count))
+            lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(name, labels, stats[0]))
+            lines.append('{}_sum{{{}}} {}'.format(name, labels, stats[2]))
+            lines.append('{}_count{{{}}} {}'.format(name, labels, stats[0]))
+
+        name = "{}_request_errors_total".format(cls.PREFIX)
+        lines.append("# TYPE {} counter".format(name))
+        for (path, request), stats in sorted(snapshot.get('requests').items()):
+            lines.append('{}{{path="{}",request="{}"}} {}'.format(name, path, request, stats[1]))
+
+        for key, metric in (('bytes_in', 'received_bytes_total'), ('bytes_out', 'sent_bytes_total')):
+            name = "{}_{}".format(cls.PREFIX, metric)
+            lines.append("# TYPE {} counter".format(name))
+            for path, value in sorted(snapshot.get(key).items()):
+                lines.append('{}{{path="{}"}} {}'.format(name, path, value))
+
+        name = "{}_active_connections".format(cls.PREFIX)
+        lines.append("# TYPE {} gauge".format(name))
+        # Port may be a unix socket path
+        for port, value in sorted(snapshot.get('connections').items(), key=lambda item: str(item[0])):
+            lines.append('{}{{port="{}"}} {}'.format(name, port, value))
+
+        for gauge, value in sorted(snapshot.get('gauges').items()):
+            name = "{}_{}".format(cls.PREFIX, gauge)
+            lines.append("# TYPE {} gauge".format(name))
+            lines.append("{} {}".format(name, value))
+
+        return "\n".join(lines) + "\n"
+
+
+# Each process has its own metrics, workers report it to route process
+metrics = RaspiIOMetrics()
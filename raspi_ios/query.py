@@ -36,19 +36,19 @@ class RaspiQueryHandle(RaspiIOHandle):
         return glob.glob(keyword)
 
     async def reboot(self, ws, data):
-        reboot = RebootSystem(**data)
+        reboot = self.decode_request(RebootSystem, data)
         self.reboot_system(reboot.delay)
         return True
 
     async def query_version(self, ws, data):
-        ver = QueryVersion(**data)
+        ver = self.decode_request(QueryVersion, data)
         ver.server = version
         ver = ver.dict
         ver.pop('handle')
         return ver
 
-    async def query_hardware(self, ws, data):
-        query = QueryHardware(**data)
+    def query_hardware(self, ws, data):
+        query = self.decode_request(QueryHardware, data)
         if query.query == QueryHardware.HARDWARE:
             cmd = "cat /proc/cpuinfo"
             sn = self.awk_query(cmd, "Serial", 3)
@@ -62,8 +62,8 @@ class RaspiQueryHandle(RaspiIOHandle):
         else:
             raise ValueError("Unknown hardware query")
 
-    async def query_device(self, ws, data):
-        query = QueryDevice(**data)
+    def query_device(self, ws, data):
+        query = self.decode_request(QueryDevice, data)
         if query.query == QueryDevice.ETH:
             interfaces = self.awk_query("ifconfig -s -a", "\ ", 1).split("\n")[1:]
             if "lo" in interfaces:
@@ -2,6 +2,9 @@
 import glob
 import fcntl
 import serial
+import asyncio
+import functools
+import concurrent.futures
 from .core import RaspiIOHandle
 from .server import register_handle
 from raspi_io.serial import SerialInit, SerialClose, SerialRead, SerialWrite, SerialFlush, SerialBaudrate
@@ -13,20 +16,37 @@ class RaspiSerialHandle(RaspiIOHandle):
     PATH = __name__.split('.')[-1]
     CATCH_EXCEPTIONS = (serial.SerialException, ValueError, RuntimeError, BlockingIOError)
 
+    # Tx does not wait previous request(e.g. a long timeout read) done
+    CONCURRENT_HANDLES = frozenset(['write'])
+
     def __init__(self):
         super(RaspiIOHandle, self).__init__()
         self.__port = serial.Serial()
 
-    def __del__(self):
+        # Tx has its own single thread, writes overlap rx but are sent in request order
+        self.__tx_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def shutdown(self):
+        self.__tx_executor.shutdown(wait=False)
         self.__port.close()
 
+        super(RaspiSerialHandle, self).shutdown()
+
+    async def run_concurrent(self, func, *args, **kwargs):
+        """Run write on tx thread, multi-thread pool would interleave concurrent writes bytes"""
+        if self.executor is None:
+            return func(*args, **kwargs)
+
+        write = functools.partial(func, *args, **kwargs)
+        return await asyncio.get_event_loop().run_in_executor(self.__tx_executor, write)
+
     @staticmethod
     def get_nodes():
         return glob.glob("/dev/ttyS*") + glob.glob("/dev/ttyAMA*") + glob.glob("/dev/ttyUSB*")
 
     async def init(self, ws, data):
         # Parse request
-        setting = SerialInit(**data)
+        setting = self.decode_request(SerialInit, data)
 
         # Create a serial port instance
         self.__port = serial.Serial(
@@ -39,32 +59,32 @@ class RaspiSerialHandle(RaspiIOHandle):
         fcntl.flock(self.__port.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
 
     async def close(self, ws, data):
-        req = SerialClose(**data)
+        req = self.decode_request(SerialClose, data)
         if self.__port.is_open:
             self.__port.flushInput()
             self.__port.flushOutput()
             self.__port.close()
 
-    async def read(self, ws, data):
+    def read(self, ws, data):
         # Parse request
-        req = SerialRead(**data)
+        req = self.decode_request(SerialRead, data)
 
         # Return read data
         data = self.__port.read(req.size)
         if len(data) == 0:
             raise RuntimeError("timeout")
 
-        return self.encode_data(data)
+        return data
 
-    async def write(self, ws, data):
-        req = SerialWrite(**data)
-        data = self.decode_data(req.data)
+    def write(self, ws, data):
+        req = self.decode_request(SerialWrite, data)
+        data = self.decode_payload(req, req.data)
 
         # Write data to serial
         return self.__port.write(data)
 
     async def flush(self, ws, data):
-        req = SerialFlush(**data)
+        req = self.decode_request(SerialFlush, data)
 
         # Flush serial port
         if req.where == SerialFlush.IN:
@@ -76,5 +96,5 @@ class RaspiSerialHandle(RaspiIOHandle):
             self.__port.flushOutput()
 
     async def set_baudrate(self, ws, data):
-        req = SerialBaudrate(**data)
+        req = self.decode_request(SerialBaudrate, data)
         self.__port.baudrate = req.baudrate
@@ -1,22 +1,49 @@
 # -*- coding: utf-8 -*-
+import os
+import glob
+import stat
+import time
 import uuid
 import socket
 import asyncio
-import websocket
+import functools
+import importlib
 import websockets
 import multiprocessing
 import concurrent.futures
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urlencode, parse_qsl
 from raspi_io.core import DEFAULT_PORT, RaspiAckMsg
 
+from . import simulation
+from .codec import CODEC_QUERY
 from .core import RaspiIOHandle
-__all__ = ['RaspiIOServer', 'register_handle', 'get_registered_handles']
+from .metrics import metrics, RaspiIOMetrics
+__all__ = ['RaspiIOServer', 'register_handle', 'get_registered_handles', 'get_handle_paths', 'get_handle_nodes']
 
 __REGISTERED_HANDLES = set()
 
+# Handle PATH -> (handle class name, device nodes or glob patterns), module raspi_ios.<PATH> is imported lazily
+HANDLE_MODULES = {
+    'gpio': ('RaspiGPIOHandle', ['gpio']),
+    'gpio_spi_flash': ('RaspiGPIOSPIFlashHandle', ['0', '1']),
+    'graph': ('RaspiMmalGraphHandle', ['lcd', 'hdmi']),
+    'i2c': ('RaspiI2CHandle', ['/dev/i2c-*']),
+    'query': ('RaspiQueryHandle', ['query']),
+    'serial': ('RaspiSerialHandle', ['/dev/ttyS*', '/dev/ttyAMA*', '/dev/ttyUSB*']),
+    'spi': ('RaspiSPIHandle', ['/dev/spidev*']),
+    'spi_flash': ('RaspiSPIFlashHandle', ['/dev/spidev*']),
+    'tvservice': ('RaspiTVServiceHandle', ['tvservice']),
+    'wireless': ('RaspiWirelessHandle', ['wireless']),
+    'app_manager': ('RaspiAppManagerHandle', ['app_manager']),
+}
+
 
 def register_handle(cls):
     if issubclass(cls, RaspiIOHandle):
+        if simulation.is_enabled():
+            simulation.attach([cls])
+
+        cls.compile_handles()
         __REGISTERED_HANDLES.add(cls)
     return cls
 
@@ -25,14 +52,79 @@ def get_registered_handles():
     return set(__REGISTERED_HANDLES)
 
 
+def get_handle_paths():
+    return sorted(HANDLE_MODULES.keys())
+
+
+def get_handle_nodes(path):
+    """Get handle device nodes without importing handle module
+
+    :param path: handle PATH
+    :return: node list
+    """
+    if simulation.is_enabled() and path in simulation.NODES:
+        return list(simulation.NODES.get(path))
+
+    nodes = list()
+    for pattern in HANDLE_MODULES[path][1]:
+        nodes.extend(glob.glob(pattern) if glob.has_magic(pattern) else [pattern])
+
+    return nodes
+
+
+def load_handle(path):
+    """Import handle module and return handle class
+
+    :param path: handle PATH
+    :return: RaspiIOHandle subclass
+    """
+    module = importlib.import_module(".{}".format(path), __package__)
+    return getattr(module, HANDLE_MODULES[path][0])
+
+
 class RaspiIOServer(object):
-    def __init__(self, address="0.0.0.0", port=DEFAULT_PORT):
+    WORKER_BACKLOG = 100
+
+    # Workers run bound methods of server (not picklable), they must be forked whatever the platform default is
+    MP_CONTEXT = multiprocessing.get_context('fork')
+    WORKER_REAP_INTERVAL = 5.0
+    METRICS_REPORT_INTERVAL = 5.0
+
+    # Client session token, session handle instance is kept alive for session timeout after client disconnected
+    SESSION_QUERY = 'session'
+
+    # Url query parameters only affect connection, they are excluded from worker and device executor uuid
+    CONNECTION_QUERIES = frozenset([CODEC_QUERY, SESSION_QUERY])
+
+    def __init__(self, address="0.0.0.0", port=DEFAULT_PORT, single_port=False, metrics_port=None,
+                 min_workers=1, max_workers=None, worker_idle_timeout=60.0, trusted_clients=False, unix_socket=None,
+                 session_timeout=0.0):
         self.__port = port
         self.__address = address
         self.__max_workers = 0
-        self.__route = multiprocessing.Manager().dict()
-        self.__free_port = multiprocessing.Manager().list()
-        self.__worker_port = multiprocessing.Manager().dict()
+        self.__single_port = single_port
+        self.__sessions = dict()
+        self.__unix_socket = unix_socket
+        self.__session_timeout = session_timeout
+        self.__metrics_port = metrics_port
+        self.__device_executors = dict()
+
+        # Worker pool bounds, default upper bound is calculated from registered handles nodes
+        self.__min_workers = min_workers
+        self.__worker_limit = max_workers
+        self.__worker_idle_timeout = worker_idle_timeout
+
+        # Port allocator state is only owned by route process, workers inform release and report metrics via pipe
+        self.__route = dict()
+        self.__workers = dict()
+        self.__free_port = list()
+        self.__worker_idle = dict()
+        self.__worker_port = dict()
+        self.__worker_pipes = dict()
+        self.__worker_metrics = dict()
+
+        # Trusted clients always send complete request, skip request required properties check
+        self.__trusted_clients = trusted_clients
 
     @staticmethod
     def get_free_port():
@@ -42,10 +134,12 @@ class RaspiIOServer(object):
         tcp.close()
         return port
 
-    @staticmethod
-    def get_url_uuid(url):
+    @classmethod
+    def get_url_uuid(cls, url):
         try:
-            return str(uuid.uuid5(uuid.NAMESPACE_OID, "{}:{}".format(url.path, url.query)))
+            # Connection options do not select device, clients of a same device share one worker
+            query = urlencode([(k, v) for k, v in parse_qsl(url.query, True) if k not in cls.CONNECTION_QUERIES])
+            return str(uuid.uuid5(uuid.NAMESPACE_OID, "{}:{}".format(url.path, query)))
         except AttributeError:
             return ""
 
@@ -57,8 +151,9 @@ class RaspiIOServer(object):
             worker_port, num = self.__worker_port.get(worker_uuid)
             self.__worker_port[worker_uuid] = (worker_port, num + 1)
         except (TypeError, ValueError):
-            # First time require, get a free port
-            worker_port = self.__free_port.pop()
+            # First time require, reuse the latest idle worker or spawn a new one
+            worker_port = self.__free_port.pop() if self.__free_port else self.spawn_worker()
+            self.__worker_idle.pop(worker_port, None)
             self.__worker_port[worker_uuid] = (worker_port, 1)
 
         return worker_port
@@ -72,84 +167,471 @@ class RaspiIOServer(object):
             if num <= 0:
                 # Client all disconnected, release this port
                 self.__worker_port.pop(worker_uuid)
-                self.__free_port.append(worker_port)
+                if worker_port in self.__workers:
+                    self.__free_port.append(worker_port)
+                    self.__worker_idle[worker_port] = time.monotonic()
             else:
                 # Decrease port reference counter
                 self.__worker_port[worker_uuid] = (worker_port, num)
         except (TypeError, ValueError):
             pass
 
-    def request_release_port(self, url):
+    def get_max_workers(self):
+        return self.__max_workers if self.__worker_limit is None else self.__worker_limit
+
+    def spawn_worker(self):
+        """Fork a worker process, called by route process
+
+        Worker listen socket is bound before fork, so client can connect to the port immediately
+        :return: worker listen port
+        """
+        if len(self.__workers) >= max(self.get_max_workers(), self.__min_workers):
+            raise RuntimeError("no free worker")
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.__address, 0))
+        sock.listen(self.WORKER_BACKLOG)
+        _, port = sock.getsockname()
+
+        reader, writer = self.__worker_pipes[port] = self.MP_CONTEXT.Pipe(duplex=False)
+        worker = self.MP_CONTEXT.Process(target=self.handle, args=(self.__address, port, sock), daemon=True)
+        worker.start()
+        sock.close()
+
+        # Only worker holds pipe writer, so reader gets EOF when worker exited
+        writer.close()
+
+        self.__workers[port] = worker
+        asyncio.get_event_loop().add_reader(reader.fileno(), self.receive_worker_message, port, reader)
+        print("Spawn worker:{}, workers:{}".format(port, len(self.__workers)))
+        return port
+
+    def remove_worker(self, port):
+        """Terminate worker and forget its port, called by route process
+
+        :param port: worker listen port
+        :return:
+        """
+        worker = self.__workers.pop(port, None)
+        if worker is not None and worker.is_alive():
+            worker.terminate()
+
         try:
-            # Connect to route server, with params release, to release port
-            websocket.create_connection("ws://{}:{}{};release?{}".format(
-                self.__address, self.__port, url.path, url.query))
-        except AttributeError:
+            reader, writer = self.__worker_pipes.pop(port)
+            asyncio.get_event_loop().remove_reader(reader.fileno())
+            reader.close()
+        except KeyError:
+            pass
+
+        if port in self.__free_port:
+            self.__free_port.remove(port)
+
+        for worker_uuid, (worker_port, _) in list(self.__worker_port.items()):
+            if worker_port == port:
+                self.__worker_port.pop(worker_uuid)
+
+        self.__worker_idle.pop(port, None)
+        self.__worker_metrics.pop(port, None)
+        print("Remove worker:{}, workers:{}".format(port, len(self.__workers)))
+
+    def reap_workers(self):
+        """Periodically terminate workers idle longer than worker idle timeout, keep at least min workers"""
+        now = time.monotonic()
+        for port in list(self.__free_port):
+            if len(self.__workers) <= self.__min_workers:
+                break
+
+            if now - self.__worker_idle.get(port, now) >= self.__worker_idle_timeout:
+                self.remove_worker(port)
+
+        # Join exited workers
+        multiprocessing.active_children()
+        asyncio.get_event_loop().call_later(self.WORKER_REAP_INTERVAL, self.reap_workers)
+
+    def request_release_port(self, port, url):
+        """Inform route process release port, called by worker process
+
+        :param port: worker listen port
+        :param url: client request url
+        :return:
+        """
+        self.send_worker_message(port, 'release', url)
+
+    def release_client(self, port, url):
+        """Release client device executor and inform route process release port, called by worker process
+
+        :param port: worker listen port
+        :param url: client request url
+        :return:
+        """
+        self.release_executor(url)
+        self.request_release_port(port, url)
+
+    def report_metrics(self, port):
+        """Periodically report worker metrics to route process, called by worker process
+
+        :param port: worker listen port
+        :return:
+        """
+        self.send_worker_message(port, 'metrics', metrics.snapshot())
+        asyncio.get_event_loop().call_later(self.METRICS_REPORT_INTERVAL, self.report_metrics, port)
+
+    def send_worker_message(self, port, kind, value):
+        try:
+            _, writer = self.__worker_pipes.get(port)
+            writer.send((kind, value))
+        except (TypeError, OSError):
+            pass
+
+    def receive_worker_message(self, port, reader):
+        try:
+            kind, value = reader.recv()
+            if kind == 'release':
+                self.release_port(value)
+            elif kind == 'metrics':
+                self.__worker_metrics[port] = value
+        except (EOFError, OSError):
+            # Worker exited
+            self.remove_worker(port)
+
+    def get_metrics(self):
+        """Get all process merged metrics
+
+        :return: Prometheus text exposition format metrics
+        """
+        if not self.__single_port:
+            metrics.set_gauge('workers', len(self.__workers))
+            metrics.set_gauge('idle_workers', len(self.__free_port))
+            metrics.set_gauge('max_workers', self.get_max_workers())
+
+        snapshots = list(self.__worker_metrics.values()) + [metrics.snapshot()]
+        return RaspiIOMetrics.exposition(RaspiIOMetrics.merge(snapshots))
+
+    async def serve_metrics(self, reader, writer):
+        """Minimal http server, reply metrics for any GET request"""
+        try:
+            request = await reader.readline()
+            while (await reader.readline()).strip():
+                pass
+
+            if request.split(b" ")[0] == b"GET":
+                status, body = "200 OK", self.get_metrics().encode()
+            else:
+                status, body = "405 Method Not Allowed", b""
+
+            writer.write("HTTP/1.0 {}\r\nContent-Type: {}\r\nContent-Length: {}\r\n\r\n".format(
+                status, RaspiIOMetrics.CONTENT_TYPE, len(body)).encode() + body)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def start_metrics_server(self, address):
+        if self.__metrics_port is None:
+            return
+
+        server = asyncio.start_server(self.serve_metrics, address, self.__metrics_port)
+        asyncio.get_event_loop().run_until_complete(server)
+
+    def acquire_executor(self, url):
+        """Get url specified device executor, all clients of a same device share one executor
+
+        :param url: client request url
+        :return: single thread executor
+        """
+        device_uuid = self.get_url_uuid(url)
+
+        try:
+            executor, num = self.__device_executors.get(device_uuid)
+        except TypeError:
+            executor, num = concurrent.futures.ThreadPoolExecutor(max_workers=1), 0
+
+        self.__device_executors[device_uuid] = (executor, num + 1)
+        return executor
+
+    def release_executor(self, url):
+        device_uuid = self.get_url_uuid(url)
+
+        try:
+            executor, num = self.__device_executors.get(device_uuid)
+            num -= 1
+            if num <= 0:
+                # Client all disconnected, shutdown device executor
+                self.__device_executors.pop(device_uuid)
+                executor.shutdown(wait=False)
+            else:
+                self.__device_executors[device_uuid] = (executor, num)
+        except TypeError:
             pass
 
     def run_forever(self):
-        self.__free_port = [self.get_free_port() for _ in range(self.__max_workers)]
-        with concurrent.futures.ProcessPoolExecutor(max_workers=self.__max_workers + 1) as executor:
-            # First submit route server to process pool
-            executor.submit(self.route, self.__address, self.__port)
-            for port in self.__free_port:
-                executor.submit(self.handle, self.__address, port)
+        if self.__single_port:
+            self.dispatch(self.__address, self.__port)
+            return
+
+        # Route process spawn workers on demand
+        self.route(self.__address, self.__port)
 
     def register(self, component):
         """Register a component, to RaspiIOServer
 
-        :param component: RaspiIOHandle type object
+        :param component: RaspiIOHandle type object or handle PATH, PATH module is imported on first connection
         :return:
         """
-        if not issubclass(component, RaspiIOHandle):
-            print("Component TypeError:{0:s}".format(type(component)))
+        if component in HANDLE_MODULES:
+            if component not in self.__route:
+                self.__route[component] = component
+                self.__max_workers += len(get_handle_nodes(component)) * 2
+                print("Success register:{}".format(component))
+            return True
+
+        if not isinstance(component, type) or not issubclass(component, RaspiIOHandle):
+            print("Component TypeError:{!r}".format(component))
             return False
 
         path = component.PATH
-        if path in self.__route:
+        if path in self.__route and not isinstance(self.__route[path], str):
             return True
 
+        # Calculate how many workers to be need, lazy registered path is already counted
+        if path not in self.__route:
+            self.__max_workers += len(component.get_nodes()) * 2
+            print("Success register:{}".format(path))
+
         # Register component route
+        component.compile_handles()
         self.__route[path] = component
-
-        # Calculate how many workers to be need
-        self.__max_workers += len(component.get_nodes()) * 2
-        print("Success register:{}".format(path))
         return True
 
-    def handle(self, address, port):
+    def get_handle(self, path):
+        """Get path registered handle, import lazy registered handle module
+
+        :param path: handle PATH
+        :return: RaspiIOHandle subclass or None
+        """
+        component = self.__route.get(path)
+        if isinstance(component, str):
+            component = load_handle(path)
+            self.__route[path] = component
+
+        return component
+
+    def attach_session(self, io_handle, url, executor=None):
+        """Resume client session kept alive after client disconnected, or create a new handle instance
+
+        :param io_handle: RaspiIOHandle subclass
+        :param url: client request url
+        :param executor: device executor
+        :return: (handle instance, session key or None if client do not have session)
+        """
+        token = dict(parse_qsl(url.query)).get(self.SESSION_QUERY)
+        if not token or self.__session_timeout <= 0:
+            return io_handle.create_instance(executor, self.__trusted_clients), None
+
+        session = (url.path, token)
+        try:
+            instance, timer, release = self.__sessions.pop(session)
+        except KeyError:
+            return io_handle.create_instance(executor, self.__trusted_clients), session
+
+        # Resumed, new connection holds its own port (executor) reference
+        timer.cancel()
+        release()
+        print("Resume session:{}({})".format(token, url.path))
+        return instance, session
+
+    def park_session(self, session, instance, release):
+        """Keep client session handle instance alive for session timeout, it is shutdown if client do not resume
+
+        :param session: session key
+        :param instance: session handle instance
+        :param release: release connection port (executor), deferred until session expired or resumed
+        :return: None, release is taken over
+        """
+        def expire():
+            self.__sessions.pop(session, None)
+            instance.shutdown()
+            release()
+
+        # Same session connected twice, previous parked one expires now
+        if session in self.__sessions:
+            previous, timer, previous_release = self.__sessions.pop(session)
+            timer.cancel()
+            previous.shutdown()
+            previous_release()
+
+        timer = asyncio.get_event_loop().call_later(self.__session_timeout, expire)
+        self.__sessions[session] = (instance, timer, release)
+        return None
+
+    def handle(self, address, port, sock=None):
         """Process client request
 
         :param address: listen address
         :param port: listen port
+        :param sock: listening socket, inherited from route process
         :return:
         """
         async def serve(ws, path):
             url = urlparse(path)
 
+            # Inform route process release port and process, deferred if client session is kept alive
+            release = functools.partial(self.request_release_port, port, url)
+
             try:
 
                 # According path get handle
-                io_handle = self.__route.get(url.path[1:])
+                io_handle = self.get_handle(url.path[1:])
                 if not issubclass(io_handle, RaspiIOHandle):
                     raise AttributeError
 
-                # Create a RaspiIOHandle instance process require
-                await io_handle.create_instance().process(ws, path)
-
-            except (AttributeError, TypeError) as e:
+                # Clients of a same device share device executor, blocking device work is serialized on it
+                executor = self.acquire_executor(url)
+                release = functools.partial(self.release_client, port, url)
+
+                # Create a RaspiIOHandle instance (or resume client session) process require
+                instance, session = self.attach_session(io_handle, url, executor)
+                metrics.connection_opened(port)
+                try:
+                    await instance.process(ws, path, resumable=session is not None)
+                finally:
+                    metrics.connection_closed(port)
+                    if session is not None:
+                        release = self.park_session(session, instance, release)
+
+            except (AttributeError, TypeError, ValueError, ImportError) as e:
                 error = RaspiAckMsg(ack=False, data="Error: {}({!r})".format(e, path))
                 await ws.send(error.dumps())
             except websockets.ConnectionClosed:
                 pass
             finally:
-                # Inform route process release port and process
-                self.request_release_port(url)
+                if release is not None:
+                    release()
 
-        handle = websockets.serve(serve, address, port)
+        if sock is not None:
+            # Forked from route process, inherited event loop and metrics belong to route process
+            asyncio.set_event_loop(asyncio.new_event_loop())
+            metrics.reset()
+
+        if self.__metrics_port is not None:
+            self.report_metrics(port)
+
+        handle = websockets.serve(serve, sock=sock) if sock is not None else websockets.serve(serve, address, port)
+        asyncio.get_event_loop().run_until_complete(handle)
+        asyncio.get_event_loop().run_forever()
+
+    async def dispatch_client(self, ws, path, port, local=False):
+        """Dispatch client request to handle according url path, blocking device work run on device executor
+
+        :param ws: websocket
+        :param path: client request url
+        :param port: listen port or unix socket path
+        :param local: client connected through unix domain socket
+        :return:
+        """
+        url = urlparse(path)
+        release = None
+
+        try:
+
+            # According path get handle
+            io_handle = self.get_handle(url.path[1:])
+            if not issubclass(io_handle, RaspiIOHandle):
+                raise AttributeError
+
+            # Blocking device work run on device executor, keep event loop responsive
+            executor = self.acquire_executor(url)
+            release = functools.partial(self.release_executor, url)
+
+            instance, session = self.attach_session(io_handle, url, executor)
+            metrics.connection_opened(port)
+            try:
+                await instance.process(ws, path, resumable=session is not None, local=local)
+            finally:
+                metrics.connection_closed(port)
+                if session is not None:
+                    release = self.park_session(session, instance, release)
+
+        except (AttributeError, TypeError, ValueError, ImportError) as e:
+            error = RaspiAckMsg(ack=False, data="Error: {}({!r})".format(e, path))
+            await ws.send(error.dumps())
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if release is not None:
+                release()
+
+    def dispatch(self, address, port):
+        """Single port mode, dispatch client request to handle according url path
+
+        :param address: listen address
+        :param port: listen port
+        :return:
+        """
+        self.start_metrics_server(address)
+        handle = websockets.serve(lambda ws, path: self.dispatch_client(ws, path, port), address, port)
         asyncio.get_event_loop().run_until_complete(handle)
+
+        if self.__unix_socket is not None:
+            self.serve_local(self.bind_unix_socket())
+
         asyncio.get_event_loop().run_forever()
 
+    def bind_unix_socket(self):
+        """Bind unix domain socket for local clients, stale socket file is removed
+
+        :return: listening socket
+        """
+        try:
+            if stat.S_ISSOCK(os.stat(self.__unix_socket).st_mode):
+                os.unlink(self.__unix_socket)
+        except FileNotFoundError:
+            pass
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.__unix_socket)
+        os.chmod(self.__unix_socket, 0o666)
+        sock.listen(self.WORKER_BACKLOG)
+        return sock
+
+    def serve_local(self, sock):
+        """Serve local clients on unix domain socket, client connect to handle url path directly
+
+        :param sock: listening unix domain socket
+        :return:
+        """
+        handle = websockets.serve(lambda ws, path: self.dispatch_client(ws, path, self.__unix_socket, local=True),
+                                  sock=sock)
+        asyncio.get_event_loop().run_until_complete(handle)
+        print("Serve local clients on:{}".format(self.__unix_socket))
+
+    def local(self, sock):
+        """Multi-port mode local clients process, forked from route process
+
+        :param sock: listening unix domain socket, inherited from route process
+        :return:
+        """
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        metrics.reset()
+
+        if self.__metrics_port is not None:
+            self.report_metrics(self.__unix_socket)
+
+        self.serve_local(sock)
+        asyncio.get_event_loop().run_forever()
+
+    def spawn_local(self):
+        """Fork local clients process, it reports metrics to route process as workers, called by route process"""
+        sock = self.bind_unix_socket()
+        reader, writer = self.__worker_pipes[self.__unix_socket] = self.MP_CONTEXT.Pipe(duplex=False)
+        self.MP_CONTEXT.Process(target=self.local, args=(sock,), daemon=True).start()
+        sock.close()
+        writer.close()
+
+        asyncio.get_event_loop().add_reader(reader.fileno(), self.receive_worker_message, self.__unix_socket, reader)
+
     def route(self, address, port):
         """Assign unused port to client and recycling client release port
 
@@ -160,24 +642,27 @@ class RaspiIOServer(object):
         async def serve(ws, path):
             try:
 
-                url = urlparse(path)
-
-                # Handle process require release port
-                if url.params == "release":
-                    self.release_port(url)
                 # Client require get a dynamic port
-                else:
-                    worker_port = self.require_port(url)
-                    await ws.send(RaspiAckMsg(ack=True, data=worker_port).dumps())
+                worker_port = self.require_port(urlparse(path))
+                await ws.send(RaspiAckMsg(ack=True, data=worker_port).dumps())
 
-                # print(self.__worker_port)
-
-            except (AttributeError, TypeError) as err:
+            except (AttributeError, TypeError, RuntimeError, OSError) as err:
                 error = RaspiAckMsg(ack=False, data="Error: {!r}".format(err))
                 await ws.send(error.dumps())
             except websockets.ConnectionClosed:
                 pass
 
+        # Keep min workers ready, idle workers are reaped periodically
+        for _ in range(self.__min_workers):
+            self.__free_port.append(self.spawn_worker())
+            self.__worker_idle[self.__free_port[-1]] = time.monotonic()
+
+        self.reap_workers()
+        self.start_metrics_server(address)
+
+        if self.__unix_socket is not None:
+            self.spawn_local()
+
         handle = websockets.serve(serve, address, port)
         asyncio.get_event_loop().run_until_complete(handle)
         asyncio.get_event_loop().run_forever()
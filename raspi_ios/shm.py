@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import os
+import mmap
+import uuid
+import struct
+__all__ = ['RaspiShmRing', 'RaspiShmChannel']
+
+
+class RaspiShmRing(object):
+    """Single producer single consumer byte ring in shared memory
+
+    Layout: head(u64, total bytes written, updated by producer), tail(u64, total bytes read, updated by consumer),
+    followed by ring data, data position is head(tail) % size
+    """
+    HEADER = struct.Struct('<QQ')
+    POSITION = struct.Struct('<Q')
+
+    def __init__(self, buffer, offset, size):
+        self.__size = size
+        self.__buffer = buffer
+        self.__offset = offset
+        self.__data = offset + self.HEADER.size
+
+    @property
+    def size(self):
+        return self.__size
+
+    def readable(self):
+        head, tail = self.HEADER.unpack_from(self.__buffer, self.__offset)
+        return head - tail
+
+    def writable(self):
+        return self.__size - self.readable()
+
+    def write(self, data):
+        """Write data to ring, called by producer
+
+        :param data: bytes like data
+        :return: written size
+        """
+        data = memoryview(data).cast('B')
+        head, tail = self.HEADER.unpack_from(self.__buffer, self.__offset)
+        if len(data) > self.__size - (head - tail):
+            raise ValueError("shared memory ring is full")
+
+        # Data may wrap around ring end
+        start = head % self.__size
+        first = min(len(data), self.__size - start)
+        self.__buffer[self.__data + start: self.__data + start + first] = data[:first]
+        self.__buffer[self.__data: self.__data + len(data) - first] = data[first:]
+
+        # Publish data after it is written
+        self.POSITION.pack_into(self.__buffer, self.__offset, head + len(data))
+        return len(data)
+
+    def read(self, size):
+        """Read data from ring, called by consumer
+
+        :param size: read size
+        :return: bytes
+        """
+        head, tail = self.HEADER.unpack_from(self.__buffer, self.__offset)
+        if size < 0 or size > head - tail:
+            raise ValueError("shared memory ring do not have {} bytes".format(size))
+
+        start = tail % self.__size
+        first = min(size, self.__size - start)
+        data = self.__buffer[self.__data + start: self.__data + start + first] + \
+            self.__buffer[self.__data: self.__data + size - first]
+
+        # Release space after data is copied
+        self.POSITION.pack_into(self.__buffer, self.__offset + self.POSITION.size, tail + size)
+        return data
+
+
+class RaspiShmChannel(object):
+    """Shared memory file with two rings, request ring (client -> server) and reply ring (server -> client)
+
+    File layout: request ring header, request ring data, reply ring header, reply ring data
+    """
+    SHM_DIR = '/dev/shm'
+    SHM_MODE = 0o600
+
+    def __init__(self, size, owner=None):
+        """Create shared memory file, only owner could access it
+
+        :param size: ring size
+        :param owner: file owner uid (local client uid), None means server process user
+        """
+        self.path = os.path.join(self.SHM_DIR, "raspi_ios_{}".format(uuid.uuid4().hex))
+        ring_size = RaspiShmRing.HEADER.size + size
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_EXCL, self.SHM_MODE)
+        try:
+            os.fchmod(fd, self.SHM_MODE)
+            if owner is not None and owner != os.geteuid():
+                os.fchown(fd, owner, -1)
+
+            os.ftruncate(fd, ring_size * 2)
+            self.__mmap = mmap.mmap(fd, ring_size * 2)
+        except OSError:
+            os.unlink(self.path)
+            raise
+        finally:
+            os.close(fd)
+
+        self.request = RaspiShmRing(self.__mmap, 0, size)
+        self.reply = RaspiShmRing(self.__mmap, ring_size, size)
+
+    def close(self):
+        self.__mmap.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
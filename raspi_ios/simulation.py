@@ -0,0 +1,672 @@
+# -*- coding: utf-8 -*-
+"""Simulated hardware backend, run raspi_ios on a host without raspberry pi hardware
+
+Set environment variable `RASPI_IOS_BACKEND=sim` (or `io_server --backend sim`) before raspi_ios is imported,
+install() injects simulated RPi.GPIO, spidev, pylibi2c, serial and pylibmmal modules into sys.modules:
+
+    spidev      /dev/spidev0.0 is loopback, /dev/spidev0.1 is connected to a 16MB SPI NOR flash
+    pylibi2c    /dev/i2c-1 has a 24C256 like eeprom(0x50) and a LM75 like temperature sensor(0x48)
+    serial      every port is a pty, tx is looped back to rx
+    RPi.GPIO    pin level, pull and output model, wire() connects an output to an input pin
+
+Device timings are multiplied by `RASPI_IOS_SIM_TIME_SCALE` (default 1.0, 0 disable all delays)
+"""
+import os
+import sys
+import tty
+import math
+import time
+import errno
+import queue
+import types
+import select
+import threading
+__all__ = ['SimClock', 'SimNorFlash', 'SimSpiDev', 'SimEEPROM', 'SimTemperatureSensor', 'SimI2CDevice',
+           'SimSerialPort', 'SimGPIO', 'SimMmalGraph', 'SimTVService', 'is_enabled', 'install', 'attach']
+
+BACKEND_ENV = 'RASPI_IOS_BACKEND'
+TIME_SCALE_ENV = 'RASPI_IOS_SIM_TIME_SCALE'
+
+SPI_NODES = ['/dev/spidev0.0', '/dev/spidev0.1']
+SPI_FLASH_NODES = ['/dev/spidev0.1']
+I2C_NODES = ['/dev/i2c-1']
+SERIAL_NODES = ['/dev/ttyS0', '/dev/ttyAMA0']
+NODES = dict(spi=SPI_NODES, spi_flash=SPI_NODES, i2c=I2C_NODES, serial=SERIAL_NODES)
+
+
+def is_enabled():
+    return os.environ.get(BACKEND_ENV, 'hw') == 'sim'
+
+
+class SimClock(object):
+    scale = float(os.environ.get(TIME_SCALE_ENV, 1.0))
+
+    @classmethod
+    def delay(cls, seconds):
+        if cls.scale > 0 and seconds > 0:
+            time.sleep(seconds * cls.scale)
+
+    @classmethod
+    def deadline(cls, seconds):
+        return time.monotonic() + seconds * cls.scale
+
+
+class SimNorFlash(object):
+    """W25Q128 like SPI NOR flash, decode opcodes from SPIFlashInstruction
+
+    Program and erase set WIP bit of status register until operation time elapsed,
+    commands other than read status are ignored while busy, program and erase need WEL bit,
+    all of them are ignored while block protection bits are set
+    """
+    WIP = 0x1
+    WEL = 0x2
+    BP_MASK = 0x3c
+    SIZE = 16 * 1024 * 1024
+    PAGE_SIZE = 256
+    SECTOR_SIZE = 4096
+    BLOCK_SIZE = 65536
+    JEDEC_ID = (0xef, 0x40, 0x18)
+
+    WRITE_SR_TIME = 0.01
+    PAGE_PROGRAM_TIME = 0.0007
+    SECTOR_ERASE_TIME = 0.045
+    BLOCK_ERASE_TIME = 0.15
+    CHIP_ERASE_TIME = 40.0
+
+    DEFAULT_INSTRUCTION = dict(
+        write_enable=0x06, write_disable=0x04, read_sr1=0x05, read_sr2=0x35, write_sr=0x01, page_read=0x03,
+        page_write=0x02, sector_erase=0x20, block_erase=0xd8, chip_erase=0xc7, read_id=0x9f
+    )
+
+    __devices = dict()
+    __devices_lock = threading.Lock()
+
+    def __init__(self, size=SIZE, instruction=None):
+        self.memory = bytearray(b'\xff') * size
+        self.__sr = 0
+        self.__busy_until = 0.0
+        self.__lock = threading.Lock()
+
+        # Opcode -> operation name, chip erase has an alias
+        self.__opcodes = {0x60: 'chip_erase'}
+        for name, default in self.DEFAULT_INSTRUCTION.items():
+            self.__opcodes[getattr(instruction, name, default) if instruction else default] = name
+
+    @classmethod
+    def get(cls, device):
+        """Get flash connected to device node, flash content is kept between connections
+
+        :param device: spi device node
+        :return: SimNorFlash
+        """
+        with cls.__devices_lock:
+            if device not in cls.__devices:
+                try:
+                    from raspi_io.spi_flash import SPIFlashInstruction
+                    instruction = SPIFlashInstruction()
+                except (ImportError, TypeError, ValueError):
+                    instruction = None
+
+                cls.__devices[device] = cls(instruction=instruction)
+
+            return cls.__devices[device]
+
+    @property
+    def status(self):
+        return self.__sr | (self.WIP if time.monotonic() < self.__busy_until else 0)
+
+    @staticmethod
+    def address(data):
+        return data[1] << 16 | data[2] << 8 | data[3]
+
+    def busy(self, seconds):
+        self.__sr &= ~self.WEL
+        self.__busy_until = SimClock.deadline(seconds)
+
+    def program(self, address, data):
+        # Program only clear bits, address wraps around in page
+        offset = address % self.PAGE_SIZE
+        base = address - offset
+        data = bytes(data[-self.PAGE_SIZE:])
+        for start, chunk in ((base + offset, data[:self.PAGE_SIZE - offset]), (base, data[self.PAGE_SIZE - offset:])):
+            if not chunk:
+                continue
+
+            old = int.from_bytes(self.memory[start: start + len(chunk)], 'big')
+            self.memory[start: start + len(chunk)] = (old & int.from_bytes(chunk, 'big')).to_bytes(len(chunk), 'big')
+
+    def erase(self, address, size):
+        address -= address % size
+        self.memory[address: address + size] = b'\xff' * size
+
+    def transfer(self, data):
+        with self.__lock:
+            return self.__transfer(data)
+
+    def __transfer(self, data):
+        name = self.__opcodes.get(data[0])
+        response = [0] * len(data)
+
+        if name == 'read_sr1':
+            return [0] + [self.status & 0xff] * (len(data) - 1)
+        elif name == 'read_sr2':
+            return [0] + [(self.status >> 8) & 0xff] * (len(data) - 1)
+        elif self.status & self.WIP:
+            return response
+
+        writable = self.__sr & self.WEL and not self.__sr & self.BP_MASK
+        if name == 'read_id':
+            response = [0] + list(self.JEDEC_ID) + [0] * (len(data) - 4)
+        elif name == 'page_read':
+            address = self.address(data)
+            response = [0] * 4 + list(self.memory[address: address + len(data) - 4])
+        elif name == 'write_enable':
+            self.__sr |= self.WEL
+        elif name == 'write_disable':
+            self.__sr &= ~self.WEL
+        elif name == 'write_sr' and self.__sr & self.WEL:
+            self.__sr = (data[1] | (data[2] << 8 if len(data) > 2 else 0)) & ~(self.WIP | self.WEL)
+            self.busy(self.WRITE_SR_TIME)
+        elif name == 'page_write' and writable:
+            self.program(self.address(data), data[4:])
+            self.busy(self.PAGE_PROGRAM_TIME)
+        elif name == 'sector_erase' and writable:
+            self.erase(self.address(data), self.SECTOR_SIZE)
+            self.busy(self.SECTOR_ERASE_TIME)
+        elif name == 'block_erase' and writable:
+            self.erase(self.address(data), self.BLOCK_SIZE)
+            self.busy(self.BLOCK_ERASE_TIME)
+        elif name == 'chip_erase' and writable:
+            self.erase(0, len(self.memory))
+            self.busy(self.CHIP_ERASE_TIME)
+
+        return response[:len(data)] + [0] * (len(data) - len(response))
+
+
+class SimSpiDev(object):
+    """spidev.SpiDev, SPI_FLASH_NODES are connected to SimNorFlash, others are loopback(miso connect to mosi)"""
+    def __init__(self):
+        self.mode = 0
+        self.bits_per_word = 8
+        self.loop = False
+        self.no_cs = False
+        self.cshigh = False
+        self.lsbfirst = False
+        self.threewire = False
+        self.max_speed_hz = 500000
+        self.__device = None
+        self.__flash = None
+
+    def open(self, bus, dev):
+        device = "/dev/spidev{}.{}".format(bus, dev)
+        if device not in SPI_NODES:
+            raise IOError(errno.ENOENT, "No such file or directory", device)
+
+        self.__device = device
+        self.__flash = SimNorFlash.get(device) if device in SPI_FLASH_NODES else None
+
+    def close(self):
+        self.__device = None
+        self.__flash = None
+
+    def xfer(self, data, speed_hz=0, delay_usecs=0, bits_per_word=0):
+        if self.__device is None:
+            raise IOError(errno.EBADF, "Bad file descriptor")
+
+        data = list(data)
+        SimClock.delay(len(data) * 8 / (speed_hz or self.max_speed_hz) + delay_usecs / 1000000)
+        return self.__flash.transfer(data) if self.__flash else data
+
+    xfer2 = xfer
+
+    def readbytes(self, size):
+        return self.xfer([0xff] * size)
+
+    def writebytes(self, data):
+        self.xfer(data)
+
+
+class SimEEPROM(object):
+    """24C256 like eeprom, 64 bytes page write, device does not acknowledge during 5ms write cycle"""
+    SIZE = 32768
+    PAGE_SIZE = 64
+    WRITE_CYCLE_TIME = 0.005
+
+    def __init__(self):
+        self.memory = bytearray(b'\xff') * self.SIZE
+        self.__busy_until = 0.0
+
+    def check_ack(self):
+        if time.monotonic() < self.__busy_until:
+            raise IOError(errno.EREMOTEIO, "Remote I/O error")
+
+    def read(self, iaddr, size):
+        self.check_ack()
+        # Sequential read wraps around whole memory
+        return bytes(self.memory[(iaddr + i) % self.SIZE] for i in range(size))
+
+    def write(self, iaddr, data):
+        self.check_ack()
+        for i, byte in enumerate(data):
+            # Driver splits data to page writes, each one takes a write cycle
+            if i and i % self.PAGE_SIZE == 0:
+                SimClock.delay(self.WRITE_CYCLE_TIME)
+
+            self.memory[(iaddr + i) % self.SIZE] = byte
+
+        self.__busy_until = SimClock.deadline(self.WRITE_CYCLE_TIME)
+        return len(data)
+
+
+class SimTemperatureSensor(object):
+    """LM75 like temperature sensor, register 0 temperature, 1 config, 2 hysteresis, 3 over temperature
+
+    Temperature is updated every 100ms conversion, drifts slowly around 25 celsius
+    """
+    CONVERSION_TIME = 0.1
+
+    def __init__(self):
+        self.__registers = {1: b'\x00', 2: self.encode(75.0), 3: self.encode(80.0)}
+
+    @staticmethod
+    def encode(temperature):
+        # 9 bits two's complement, 0.5 celsius resolution, msb first
+        return ((int(temperature * 2) & 0x1ff) << 7).to_bytes(2, 'big')
+
+    def temperature(self):
+        conversion = int(time.monotonic() / self.CONVERSION_TIME) * self.CONVERSION_TIME
+        return 25.0 + 5.0 * math.sin(2 * math.pi * conversion / 600)
+
+    def read(self, iaddr, size):
+        register = self.encode(self.temperature()) if iaddr & 0x3 == 0 else self.__registers.get(iaddr & 0x3)
+        return bytes(register[i % len(register)] for i in range(size))
+
+    def write(self, iaddr, data):
+        if iaddr & 0x3:
+            self.__registers[iaddr & 0x3] = bytes(data[:1 if iaddr & 0x3 == 1 else 2])
+
+        return len(data)
+
+
+class SimI2CDevice(object):
+    """pylibi2c.I2CDevice, 100KHz bus, address without device raise ENXIO"""
+    BUS_SPEED = 100000
+    DEVICES = {0x50: SimEEPROM, 0x48: SimTemperatureSensor}
+
+    __targets = dict()
+    __targets_lock = threading.Lock()
+
+    def __init__(self, bus, addr, iaddr_bytes=1, **kwargs):
+        if bus not in I2C_NODES:
+            raise IOError(errno.ENOENT, "No such file or directory", bus)
+
+        self.bus = bus
+        self.addr = addr
+        self.iaddr_bytes = iaddr_bytes
+        with self.__targets_lock:
+            if (bus, addr) not in self.__targets and addr in self.DEVICES:
+                self.__targets[(bus, addr)] = self.DEVICES[addr]()
+
+            self.__target = self.__targets.get((bus, addr))
+
+    def __transfer(self, size):
+        # Each byte is 8 bits plus ack, address and internal address are included
+        SimClock.delay((1 + self.iaddr_bytes + size) * 9 / self.BUS_SPEED)
+        if self.__target is None:
+            raise IOError(errno.ENXIO, "No such device or address")
+
+    def read(self, iaddr, size):
+        self.__transfer(size)
+        return self.__target.read(iaddr, size)
+
+    def write(self, iaddr, data):
+        self.__transfer(len(data))
+        return self.__target.write(iaddr, bytes(data))
+
+    ioctl_read = read
+    ioctl_write = write
+
+    def close(self):
+        self.__target = None
+
+
+class SerialException(IOError):
+    pass
+
+
+class SimSerialPort(object):
+    """serial.Serial on a pty, a loopback thread echoes tx to rx at baudrate speed"""
+    def __init__(self, port=None, baudrate=9600, bytesize=8, parity='N', stopbits=1, timeout=None, **kwargs):
+        self.port = port
+        self.timeout = timeout
+        self.baudrate = baudrate
+        self.bytesize = bytesize
+        self.parity = parity
+        self.stopbits = stopbits
+        self.__master = None
+        self.__slave = None
+        if port is not None:
+            self.open()
+
+    @property
+    def is_open(self):
+        return self.__slave is not None
+
+    @property
+    def frame_bits(self):
+        return 1 + self.bytesize + (0 if self.parity == 'N' else 1) + self.stopbits
+
+    def open(self):
+        if self.port not in SERIAL_NODES:
+            raise SerialException(errno.ENOENT, "could not open port {}".format(self.port))
+
+        self.__master, self.__slave = os.openpty()
+        tty.setraw(self.__slave)
+        threading.Thread(target=self.__loopback, args=(self.__master,), daemon=True).start()
+
+    def __loopback(self, master):
+        while True:
+            try:
+                data = os.read(master, 4096)
+                SimClock.delay(len(data) * self.frame_bits / self.baudrate)
+                os.write(master, data)
+            except OSError:
+                # Slave is closed
+                os.close(master)
+                break
+
+    def fileno(self):
+        return self.__slave
+
+    def read(self, size=1):
+        if self.__slave is None:
+            raise SerialException("Attempting to use a port that is not open")
+
+        data = bytearray()
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while len(data) < size:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not select.select([self.__slave], [], [], timeout)[0]:
+                break
+
+            data += os.read(self.__slave, size - len(data))
+
+        return bytes(data)
+
+    def write(self, data):
+        if self.__slave is None:
+            raise SerialException("Attempting to use a port that is not open")
+
+        data = bytes(data)
+        os.write(self.__slave, data)
+        return len(data)
+
+    def flushInput(self):
+        while self.__slave is not None and select.select([self.__slave], [], [], 0)[0]:
+            os.read(self.__slave, 4096)
+
+    def flushOutput(self):
+        pass
+
+    def close(self):
+        if self.__slave is not None:
+            os.close(self.__slave)
+            self.__slave = None
+
+
+class SimGPIO(object):
+    """RPi.GPIO pin model
+
+    Output pin keeps the level it is driven to, input pin reads the level of the output pin wired
+    to it, otherwise reads its pull up/down level. Input pin edge detection callbacks are called
+    in order on a callback thread
+    """
+    BOARD, BCM = 10, 11
+    OUT, IN = 0, 1
+    LOW, HIGH = 0, 1
+    PUD_OFF, PUD_DOWN, PUD_UP = 20, 21, 22
+    RISING, FALLING, BOTH = 31, 32, 33
+
+    def __init__(self):
+        self.mode = None
+        self.__pins = dict()
+        self.__wires = dict()
+        self.__events = dict()
+        self.__callbacks = None
+        self.__lock = threading.Lock()
+
+    def channels(self, channel):
+        return list(channel) if isinstance(channel, (list, tuple)) else [channel]
+
+    def wire(self, output, input):
+        """Connect output pin to input pin
+
+        :param output: output channel
+        :param input: input channel
+        :return:
+        """
+        self.__wires[input] = output
+
+    def is_setup(self, channel):
+        return channel in self.__pins
+
+    def setmode(self, mode):
+        if mode not in (self.BOARD, self.BCM):
+            raise ValueError("An invalid mode was passed to setmode()")
+
+        self.mode = mode
+
+    def getmode(self):
+        return self.mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, channel, direction, pull_up_down=PUD_OFF, initial=None):
+        if self.mode is None:
+            raise RuntimeError("Please set pin numbering mode using GPIO.setmode(GPIO.BOARD) or GPIO.setmode(GPIO.BCM)")
+
+        with self.__lock:
+            for ch in self.channels(channel):
+                level = (initial or 0) if direction == self.OUT else (1 if pull_up_down == self.PUD_UP else 0)
+                self.__pins[ch] = dict(direction=direction, pull=pull_up_down, level=1 if level else 0)
+
+    def output(self, channel, value):
+        values = self.channels(value) if isinstance(value, (list, tuple)) else None
+        with self.__lock:
+            for i, ch in enumerate(self.channels(channel)):
+                pin = self.__pins.get(ch)
+                if pin is None or pin['direction'] != self.OUT:
+                    raise RuntimeError("The GPIO channel has not been set up as an OUTPUT")
+
+                level = 1 if (values[i] if values else value) else 0
+                if level != pin['level'] and self.__events:
+                    self.detect_edge(ch, level)
+
+                pin['level'] = level
+
+    def detect_edge(self, output, level):
+        """Output pin level changed, call wired input pins edge detection callbacks
+
+        :param output: output channel
+        :param level: output new level
+        :return:
+        """
+        now = time.monotonic()
+        for input, source in self.__wires.items():
+            event = self.__events.get(input)
+            if source != output or event is None:
+                continue
+
+            if event['edge'] != self.BOTH and event['edge'] != (self.RISING if level else self.FALLING):
+                continue
+
+            # Debounce, edges within bounce time after last one are ignored
+            if now - event['last'] < event['bouncetime'] / 1000:
+                continue
+
+            event['last'] = now
+            if self.__callbacks is None:
+                self.__callbacks = queue.Queue()
+                threading.Thread(target=self.run_callbacks, daemon=True).start()
+
+            self.__callbacks.put((event['callback'], input))
+
+    def run_callbacks(self):
+        while True:
+            callback, channel = self.__callbacks.get()
+            callback(channel)
+
+    def add_event_detect(self, channel, edge, callback=None, bouncetime=None):
+        pin = self.__pins.get(channel)
+        if pin is None or pin['direction'] != self.IN:
+            raise RuntimeError("You must setup() the GPIO channel as an input first")
+
+        if edge not in (self.RISING, self.FALLING, self.BOTH):
+            raise ValueError("The edge must be set to RISING, FALLING or BOTH")
+
+        with self.__lock:
+            if channel in self.__events:
+                raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+
+            self.__events[channel] = dict(edge=edge, callback=callback, bouncetime=bouncetime or 0, last=-1e9)
+
+    def remove_event_detect(self, channel):
+        with self.__lock:
+            self.__events.pop(channel, None)
+
+    def input(self, channel):
+        pin = self.__pins.get(channel)
+        if pin is None:
+            raise RuntimeError("You must setup() the GPIO channel first")
+
+        source = self.__pins.get(self.__wires.get(channel))
+        if pin['direction'] == self.IN and source is not None:
+            return source['level']
+
+        return pin['level']
+
+    def cleanup(self, channel=None):
+        with self.__lock:
+            for ch in self.channels(channel) if channel is not None else list(self.__pins):
+                self.__pins.pop(ch, None)
+                self.__events.pop(ch, None)
+
+    def create_pwm(self):
+        gpio = self
+
+        class PWM(object):
+            def __init__(self, channel, frequency):
+                if not gpio.is_setup(channel):
+                    raise RuntimeError("You must setup() the GPIO channel first")
+
+                self.channel = channel
+                self.frequency = frequency
+                self.duty_cycle = 0
+
+            def start(self, duty_cycle):
+                self.duty_cycle = duty_cycle
+
+            def ChangeDutyCycle(self, duty_cycle):
+                self.duty_cycle = duty_cycle
+
+            def ChangeFrequency(self, frequency):
+                self.frequency = frequency
+
+            def stop(self):
+                self.duty_cycle = 0
+
+        return PWM
+
+    def create_module(self):
+        module = types.ModuleType('RPi.GPIO')
+        for name in ('BOARD', 'BCM', 'OUT', 'IN', 'LOW', 'HIGH', 'PUD_OFF', 'PUD_DOWN', 'PUD_UP',
+                     'RISING', 'FALLING', 'BOTH'):
+            setattr(module, name, getattr(self, name))
+
+        for name in ('setmode', 'getmode', 'setwarnings', 'setup', 'output', 'input', 'cleanup', 'wire',
+                     'add_event_detect', 'remove_event_detect'):
+            setattr(module, name, getattr(self, name))
+
+        module.PWM = self.create_pwm()
+        return module
+
+
+class SimMmalGraph(object):
+    """pylibmmal.MmalGraph, decode at 20MB/s"""
+    DECODE_SPEED = 20 * 1024 * 1024
+
+    def __init__(self, display_num=0):
+        self.is_open = False
+        self.display_num = display_num
+
+    def open(self, path):
+        SimClock.delay(os.path.getsize(path) / self.DECODE_SPEED)
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+
+class SimTVService(object):
+    def __init__(self):
+        self.__power = True
+
+    def get_status(self):
+        return dict(state=0x12 if self.__power else 0x1, width=1920, height=1080, frame_rate=60)
+
+    def get_modes(self, group):
+        return [dict(code=16, width=1920, height=1080, frame_rate=60)]
+
+    def get_preferred_mode(self):
+        return dict(group=1, code=16)
+
+    def set_preferred(self):
+        self.__power = True
+
+    def set_explicit(self, group, code):
+        self.__power = True
+
+    def power_off(self):
+        self.__power = False
+
+
+def install():
+    """Inject simulated hardware modules, must be called before handle modules are imported"""
+    rpi = types.ModuleType('RPi')
+    rpi.GPIO = SimGPIO().create_module()
+
+    spidev = types.ModuleType('spidev')
+    spidev.SpiDev = SimSpiDev
+
+    pylibi2c = types.ModuleType('pylibi2c')
+    pylibi2c.I2CDevice = SimI2CDevice
+
+    serial = types.ModuleType('serial')
+    serial.Serial = SimSerialPort
+    serial.SerialException = SerialException
+
+    pylibmmal = types.ModuleType('pylibmmal')
+    pylibmmal.LCD, pylibmmal.HDMI = 4, 5
+    pylibmmal.MmalGraph = SimMmalGraph
+    pylibmmal.TVService = SimTVService
+
+    sys.modules.update({
+        'RPi': rpi, 'RPi.GPIO': rpi.GPIO, 'spidev': spidev, 'pylibi2c': pylibi2c, 'serial': serial,
+        'pylibmmal': pylibmmal
+    })
+
+
+def attach(handles):
+    """Replace handles device node discovery (and hardware register backends) with simulated ones
+
+    :param handles: handle classes
+    :return:
+    """
+    for handle in handles:
+        if handle.PATH in NODES:
+            handle.get_nodes = staticmethod(lambda path=handle.PATH: list(NODES[path]))
+
+        # Hardware register backends bypass simulated modules
+        if hasattr(handle, 'PORT_BACKENDS'):
+            handle.PORT_BACKENDS = tuple(backend for backend in handle.PORT_BACKENDS if not backend.HARDWARE)
@@ -16,15 +16,17 @@ class RaspiSPIHandle(RaspiIOHandle):
         super(RaspiSPIHandle, self).__init__()
         self.__spi = spidev.SpiDev()
 
-    def __del__(self):
+    def shutdown(self):
         self.__spi.close()
 
+        super(RaspiSPIHandle, self).shutdown()
+
     @staticmethod
     def get_nodes():
         return glob.glob("/dev/spidev*")
 
     async def open(self, ws, data):
-        device = SPIDevice(**data)
+        device = self.decode_request(SPIDevice, data)
         if device.device not in self.get_nodes():
             raise IOError("Open spi device error, no such device:{}".format(device.device))
 
@@ -47,31 +49,31 @@ class RaspiSPIHandle(RaspiIOHandle):
         return True
 
     async def close(self, ws, data):
-        SPIClose(**data)
+        self.decode_request(SPIClose, data)
         self.__spi.close()
         return True
 
-    async def read(self, ws, data):
-        req = SPIRead(**data)
+    def read(self, ws, data):
+        req = self.decode_request(SPIRead, data)
         result = self.__spi.readbytes(req.size)
-        return self.encode_data(result) if len(result) == req.size else None
+        return bytes(result) if len(result) == req.size else None
 
-    async def write(self, ws, data):
-        req = SPIWrite(**data)
-        data = self.decode_data(req.data)
+    def write(self, ws, data):
+        req = self.decode_request(SPIWrite, data)
+        data = self.decode_payload(req, req.data)
         self.__spi.writebytes(list(data))
         return len(data)
 
-    async def xfer(self, ws, data):
-        req = SPIXfer(**data)
-        write_data = self.decode_data(req.write_data)
+    def xfer(self, ws, data):
+        req = self.decode_request(SPIXfer, data)
+        write_data = self.decode_payload(req, req.write_data)
         speed = req.speed * 1000 or self.__spi.max_speed_hz
         read_data = self.__spi.xfer(list(write_data) + [0] * req.read_size, speed, req.delay)
-        return self.encode_data(bytes(read_data)[len(write_data):])
+        return bytes(read_data)[len(write_data):]
 
-    async def xfer2(self, ws, data):
-        req = SPIXfer2(**data)
-        write_data = self.decode_data(req.write_data)
+    def xfer2(self, ws, data):
+        req = self.decode_request(SPIXfer2, data)
+        write_data = self.decode_payload(req, req.write_data)
         speed = req.speed * 1000 or self.__spi.max_speed_hz
         read_data = self.__spi.xfer2(list(write_data) + [0] * req.read_size, speed, req.delay)
-        return self.encode_data(bytes(read_data)[len(write_data):])
+        return bytes(read_data)[len(write_data):]
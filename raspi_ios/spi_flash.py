@@ -15,6 +15,9 @@ class RaspiSPIFlashHandle(RaspiIOHandle):
     PATH = __name__.split('.')[-1]
     CATCH_EXCEPTIONS = (IOError, ValueError, RuntimeError, IOError, IndexError, AttributeError)
 
+    # Status poll does not wait previous request(e.g. chip erase) done
+    CONCURRENT_HANDLES = frozenset(['read_status'])
+
     def __init__(self):
         super(RaspiSPIFlashHandle, self).__init__()
         self.__spi = spidev.SpiDev()
@@ -22,9 +25,11 @@ class RaspiSPIFlashHandle(RaspiIOHandle):
         self.__flash_page_size = 0
         self.__flash_instruction = SPIFlashInstruction()
 
-    def __del__(self):
+    def shutdown(self):
         self.__spi.close()
 
+        super(RaspiSPIFlashHandle, self).shutdown()
+
     @staticmethod
     def get_nodes():
         return glob.glob("/dev/spidev*")
@@ -53,6 +58,25 @@ class RaspiSPIFlashHandle(RaspiIOHandle):
         cmd = [self.__flash_instruction.page_read, (address >> 16) & 0xff, (address >> 8) & 0xff, address & 0xff]
         return bytearray(self.__spi.xfer(cmd + [0] * self.__flash_page_size)[4:])
 
+    def read_data(self, address, size):
+        first_page = address // self.__flash_page_size
+        last_page = (address + size + self.__flash_page_size - 1) // self.__flash_page_size
+
+        data = bytearray()
+        for page in range(first_page, last_page):
+            data += self.read_page(page)
+
+        offset = address - first_page * self.__flash_page_size
+        return bytes(data[offset: offset + size])
+
+    def write_data(self, data):
+        data = memoryview(data)
+
+        # Write data to page, only convert current page to list
+        for page in range(int(self.__flash_chip_size / self.__flash_page_size)):
+            start = page * self.__flash_page_size
+            self.write_page(page, list(data[start: start + self.__flash_page_size]))
+
     def write_page(self, page, data):
         address = page * self.__flash_page_size
         cmd = [self.__flash_instruction.page_write, (address >> 16) & 0xff, (address >> 8) & 0xff, address & 0xff]
@@ -66,7 +90,7 @@ class RaspiSPIFlashHandle(RaspiIOHandle):
         self.busy_wait()
 
     async def open(self, ws, data):
-        flash = SPIFlashDevice(**data)
+        flash = self.decode_request(SPIFlashDevice, data)
         # Get spi bus and dev from device name
         node = flash.device.split("spidev")[-1]
         bus = int(node.split(".")[0])
@@ -94,12 +118,12 @@ class RaspiSPIFlashHandle(RaspiIOHandle):
     async def read_status(self, ws, data):
         return self.get_sr()
 
-    async def write_status(self, ws, data):
-        data = SPIFlashWriteStatus(**data)
+    def write_status(self, ws, data):
+        data = self.decode_request(SPIFlashWriteStatus, data)
         self.set_sr(data.status)
         return True
 
-    async def erase(self, ws, data):
+    def erase(self, ws, data):
         # First clear block protection bit
         status = self.get_sr()
         if status & self.BP_MASK:
@@ -115,31 +139,28 @@ class RaspiSPIFlashHandle(RaspiIOHandle):
         return True
 
     async def read_chip(self, ws, data):
+        # Streaming dump, memory bounded to a few pages
+        if data.get('stream'):
+            await self.send_binary_stream(ws, self.__flash_chip_size, self.read_data)
+            return True
+
         # First read chip data to memory
-        chip_data = bytes()
-        for page in range(int(self.__flash_chip_size / self.__flash_page_size)):
-            chip_data += self.read_page(page)
+        chip_data = await self.run_blocking(self.read_data, 0, self.__flash_chip_size)
 
         # Second generate binary data header
         header = get_binary_data_header(chip_data)
-        await ws.send(header.dumps())
+        await self.send_frame(ws, header.dumps())
 
         # Finally send chip data
         for i in range(header.slices):
-            await ws.send(chip_data[i * DATA_TRANSFER_BLOCK_SIZE: (i + 1) * DATA_TRANSFER_BLOCK_SIZE])
+            await self.send_frame(ws, chip_data[i * DATA_TRANSFER_BLOCK_SIZE: (i + 1) * DATA_TRANSFER_BLOCK_SIZE])
 
         return True
 
     async def write_chip(self, ws, data):
-        header = RaspiBinaryDataHeader(**data)
-        chip_data = await self.receive_binary_data(ws, header)
-
-        # Convert data to list
-        chip_data = list(chip_data)
-
-        # Write data to page
-        for page in range(int(self.__flash_chip_size / self.__flash_page_size)):
-            start = page * self.__flash_page_size
-            self.write_page(page, chip_data[start: start + self.__flash_page_size])
+        header = self.decode_request(RaspiBinaryDataHeader, data)
+        chip_data = await self.receive_binary_data(ws, header, cache=True, max_size=self.__flash_chip_size)
 
+        # Write data to chip on device executor
+        await self.run_blocking(self.write_data, chip_data)
         return True
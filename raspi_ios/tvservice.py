@@ -20,20 +20,20 @@ class RaspiTVServiceHandle(RaspiIOHandle):
     def get_nodes():
         return [RaspiTVServiceHandle.PATH]
 
-    async def power_ctrl(self, ws, data):
-        ctrl = TVPower(**data)
+    def power_ctrl(self, ws, data):
+        ctrl = self.decode_request(TVPower, data)
         self.__tv.set_preferred() if ctrl.power else self.__tv.power_off()
         return True
 
-    async def get_modes(self, ws, data):
-        req = TVGetModes(**data)
+    def get_modes(self, ws, data):
+        req = self.decode_request(TVGetModes, data)
         return self.__tv.get_preferred_mode() if req.preferred else self.__tv.get_modes(req.group)
 
-    async def get_status(self, ws, data):
-        st = TVStatus(**data)
+    def get_status(self, ws, data):
+        st = self.decode_request(TVStatus, data)
         return self.__tv.get_status()
 
-    async def set_explicit(self, ws, data):
-        req = TVSetExplicit(**data)
+    def set_explicit(self, ws, data):
+        req = self.decode_request(TVSetExplicit, data)
         self.__tv.set_preferred() if req.preferred else self.__tv.set_explicit(group=req.group, mode=req.mode)
         return True
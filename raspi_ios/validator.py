@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from raspi_io.core import RaspiBaseMsg, RaspiMsgDecodeError
+__all__ = ['RaspiMsgValidator']
+
+
+class RaspiMsgValidator(object):
+    """Compiled raspi_io message validator
+
+    Compiled once per message class, required properties are checked against a frozenset and message is built
+    without the generic decode path. Message class with its own __init__ (defaults, extra checks) is always built
+    by its __init__
+    """
+    __validators = dict()
+
+    def __init__(self, message):
+        self.message = message
+        self.required = frozenset(message._properties)
+
+        # Attributes base __init__ adds besides request fields, None means fast path is not available
+        self.extra = None
+        if message.__init__ is RaspiBaseMsg.__init__:
+            try:
+                probe = message(**{key: 0 for key in self.required})
+                self.extra = {key: value for key, value in probe.__dict__.items() if key not in self.required}
+            except (RaspiMsgDecodeError, TypeError, ValueError):
+                pass
+
+    @classmethod
+    def get(cls, message):
+        """Get message class compiled validator
+
+        :param message: raspi_io message class
+        :return: RaspiMsgValidator
+        """
+        validator = cls.__validators.get(message)
+        if validator is None:
+            validator = cls.__validators.setdefault(message, cls(message))
+
+        return validator
+
+    def decode(self, data, trusted=False):
+        """Decode request dict to message
+
+        :param data: request dict
+        :param trusted: trusted client, skip required properties check
+        :return: message instance
+        """
+        # Compact binary codecs (msgpack, cbor) could decode a map with non-str keys
+        if not all(isinstance(key, str) for key in data):
+            raise RaspiMsgDecodeError("invalid keys:{!r}".format([key for key in data if not isinstance(key, str)]))
+
+        if self.extra is None:
+            return self.message(**data)
+
+        # Only missing properties are rejected, explicit None is accepted as generic decode path does
+        if not trusted and not data.keys() >= self.required:
+            raise RaspiMsgDecodeError("do not found key:{!r}".format(", ".join(sorted(self.required.difference(data)))))
+
+        merged = dict(self.extra)
+        merged.update(data)
+        message = self.message.__new__(self.message)
+        message.__dict__ = merged
+        return message
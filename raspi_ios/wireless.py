@@ -105,11 +105,11 @@ class RaspiWirelessHandle(RaspiIOHandle):
         return open(self.WPA_CONFIG_PATH, 'w')
 
     async def get_networks(self, ws, data):
-        GetNetworks(**data)
+        self.decode_request(GetNetworks, data)
         return self.parser.network_list
 
     async def join_network(self, ws, data):
-        join = JoinNetwork(**data)
+        join = self.decode_request(JoinNetwork, data)
 
         keys = [k for k, v in join.dict.items() if v and k != 'handle']
         keys = sorted(keys, key=lambda x: x != 'ssid')
@@ -120,7 +120,7 @@ class RaspiWirelessHandle(RaspiIOHandle):
         return True
 
     async def leave_network(self, ws, data):
-        leave = LeaveNetwork(**data)
+        leave = self.decode_request(LeaveNetwork, data)
         if leave.ssid not in self.parser.network_list:
             raise RuntimeError("Network: {!r} is not exist".format(leave.ssid))
 
@@ -43,7 +43,9 @@ setuptools.setup(
     ],
     packages=packages,
     extras_require={
-        ':python_version>="3.5"': ['asyncio', 'websockets==3.4', 'websocket', 'lockfile', 'python-daemon',
+        ':python_version>="3.5"': ['asyncio', 'websockets==3.4', 'lockfile', 'python-daemon',
                                    'spidev==3.3', 'RPi.GPIO', 'pyserial', 'raspi_io>=0.26', 'pylibi2c', 'pylibmmal'],
+        'msgpack': ['msgpack'],
+        'cbor': ['cbor2'],
     },
 )
\ No newline at end of file
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+import os
+
+# Tests run on simulated hardware, it must be selected before raspi_ios is imported
+os.environ.setdefault('RASPI_IOS_BACKEND', 'sim')
+os.environ.setdefault('RASPI_IOS_SIM_TIME_SCALE', '0')
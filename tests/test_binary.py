@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import os
+import asyncio
+import hashlib
+import unittest
+import tempfile
+from unittest import mock
+from .util import FakeWebSocket, run
+from raspi_ios.core import RaspiIOHandle
+from raspi_io.core import RaspiBinaryDataHeader
+
+
+def get_header(data, slices=1, fmt='', size=None):
+    return RaspiBinaryDataHeader(md5=hashlib.md5(data).hexdigest(), size=len(data) if size is None else size,
+                                 slices=slices, format=fmt)
+
+
+class TestReceiveBinaryData(unittest.TestCase):
+    def setUp(self):
+        self.blob_dir = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(RaspiIOHandle, 'BLOB_DIR', self.blob_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.blob_dir.cleanup)
+
+    def receive(self, header, frames, **kwargs):
+        return run(RaspiIOHandle.receive_binary_data(FakeWebSocket(frames), header, **kwargs))
+
+    def test_receive_slices(self):
+        data = os.urandom(10000)
+        frames = [data[:4096], data[4096:8192], data[8192:]]
+        self.assertEqual(self.receive(get_header(data, slices=3), frames), data)
+
+        path = self.receive(get_header(data, slices=3), frames, save_as_file=True)
+        with open(path, 'rb') as fp:
+            self.assertEqual(fp.read(), data)
+
+    def test_oversize_header_rejected(self):
+        with self.assertRaises(ValueError):
+            self.receive(get_header(b'', size=RaspiIOHandle.BLOB_STORE_SIZE + 1), [])
+
+        with self.assertRaises(ValueError):
+            self.receive(get_header(b'x' * 16), [b'x' * 16], max_size=8)
+
+    def test_buffer_is_not_allocated_by_header(self):
+        header = get_header(b'x' * 16, size=RaspiIOHandle.BLOB_STORE_SIZE)
+        with mock.patch('raspi_ios.core.bytearray', create=True, wraps=bytearray) as allocate:
+            with self.assertRaises(ValueError):
+                self.receive(header, [b'x' * 16])
+
+        self.assertNotIn(mock.call(RaspiIOHandle.BLOB_STORE_SIZE), allocate.call_args_list)
+
+    def test_data_mismatch(self):
+        data = b'0123456789'
+        with self.assertRaises(ValueError):
+            self.receive(get_header(data), [data + b'x'])
+
+        with self.assertRaises(ValueError):
+            self.receive(get_header(data), [data[::-1]])
+
+        self.assertEqual(os.listdir(self.blob_dir.name), [])
+
+    def test_cancel_removes_part_file(self):
+        class SlowWebSocket(FakeWebSocket):
+            async def recv(self):
+                if self.frames:
+                    return self.frames.pop(0)
+
+                await asyncio.sleep(10)
+
+        async def cancel_receive():
+            ws = SlowWebSocket([b'x' * 4096])
+            task = asyncio.ensure_future(RaspiIOHandle.receive_binary_data(
+                ws, get_header(b'x' * 8192, slices=2), save_as_file=True))
+            await asyncio.sleep(0.05)
+            self.assertEqual(len(os.listdir(self.blob_dir.name)), 1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        run(cancel_receive())
+        self.assertEqual(os.listdir(self.blob_dir.name), [])
+
+    def test_in_memory_receive_accepts_any_format(self):
+        data = b'package'
+        self.assertEqual(self.receive(get_header(data, fmt='TGZ'), [data], cache=True), data)
+        self.assertEqual(os.listdir(self.blob_dir.name), [])
+
+        with self.assertRaises(ValueError):
+            self.receive(get_header(data, fmt='../TGZ'), [data], save_as_file=True)
+
+    def test_cache_hit_and_miss(self):
+        data = b'cached blob'
+        with self.assertRaises(ValueError):
+            self.receive(get_header(data, slices=0, fmt='bin'), [])
+
+        self.assertEqual(self.receive(get_header(data, fmt='bin'), [data], cache=True), data)
+        self.assertEqual(self.receive(get_header(data, slices=0, fmt='bin'), []), data)
+
+        path = self.receive(get_header(data, slices=0, fmt='bin'), [], save_as_file=True)
+        self.assertEqual(os.path.basename(path), '{}.bin'.format(hashlib.md5(data).hexdigest()))
+
+    def test_cache_hit_size_mismatch(self):
+        data = b'cached blob'
+        self.receive(get_header(data), [data], save_as_file=True)
+        with self.assertRaises(ValueError):
+            self.receive(get_header(data, slices=0, size=len(data) + 1), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import time
+import asyncio
+import unittest
+from .util import run_client
+from raspi_ios.core import RaspiIOHandle
+
+
+class WorkHandle(RaspiIOHandle):
+    PATH = 'work'
+    CATCH_EXCEPTIONS = (ValueError,)
+    CONCURRENT_HANDLES = frozenset(['status'])
+
+    def __init__(self):
+        super(WorkHandle, self).__init__()
+        self.done = list()
+
+    def work(self, ws, data):
+        time.sleep(data.get('seconds', 0))
+        self.done.append(data.get('name'))
+        return data.get('name')
+
+    def status(self, ws, data):
+        return 'ready'
+
+    async def echo(self, ws, data):
+        return data.get('value')
+
+    async def fail(self, ws, data):
+        raise ValueError("failed")
+
+
+class TestBatch(unittest.TestCase):
+    def run_batch(self, **kwargs):
+        requests = [dict(handle='echo', value=1), dict(handle='fail'), dict(handle='work', name='a')]
+        ws = run_client(WorkHandle.create_instance(), [dict(handle='batch', requests=requests, **kwargs)], acks=1)
+        self.assertTrue(ws.replies[0]['ack'])
+        return ws.replies[0]['data']
+
+    def test_stop_on_error(self):
+        acks = self.run_batch()
+        self.assertEqual([ack['ack'] for ack in acks], [True, False])
+        self.assertEqual(acks[0]['data'], 1)
+
+    def test_continue_on_error(self):
+        acks = self.run_batch(stop_on_error=False)
+        self.assertEqual([ack['ack'] for ack in acks], [True, False, True])
+        self.assertEqual(acks[2]['data'], 'a')
+
+    def test_nested_batch_rejected(self):
+        requests = [dict(handle='batch', requests=[])]
+        ws = run_client(WorkHandle.create_instance(), [dict(handle='batch', requests=requests)], acks=1)
+        self.assertFalse(ws.replies[0]['data'][0]['ack'])
+
+
+class TestTaggedRequests(unittest.TestCase):
+    def test_out_of_order_acks(self):
+        handle = WorkHandle.create_instance()
+        frames = [dict(handle='work', name='slow', seconds=0.2, id=1), dict(handle='work', name='fast', id=2),
+                  dict(handle='status', id=3), dict(handle='echo', value='inline', id=4)]
+        ws = run_client(handle, frames, acks=4)
+
+        self.assertEqual({reply['id']: reply['data'] for reply in ws.replies},
+                         {1: 'slow', 2: 'fast', 3: 'ready', 4: 'inline'})
+        # Concurrent handle acks before pending blocking work, coroutine handle waits for it
+        self.assertEqual([reply['id'] for reply in ws.replies], [3, 1, 2, 4])
+
+        # Blocking handles of a device still run in request order
+        self.assertEqual(handle.done, ['slow', 'fast'])
+
+    def test_untagged_requests_keep_order(self):
+        frames = [dict(handle='work', name='slow', seconds=0.05), dict(handle='echo', value='next')]
+        ws = run_client(WorkHandle.create_instance(), frames, acks=2)
+        self.assertEqual([reply['data'] for reply in ws.replies], ['slow', 'next'])
+        self.assertNotIn('id', ws.replies[0])
+
+    def test_unknown_request(self):
+        ws = run_client(WorkHandle.create_instance(), [dict(handle='unknown', id=5)], acks=1)
+        self.assertFalse(ws.replies[0]['ack'])
+
+
+if __name__ == '__main__':
+    unittest.main()
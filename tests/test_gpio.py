@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+from .util import run_client, FakeWebSocket, run
+from raspi_ios.gpio import RaspiGPIOHandle, GPIO
+
+
+def setup(channel, direction):
+    return dict(handle='setup', channel=channel, direction=direction, pull_up_down=GPIO.PUD_OFF, initial=0)
+
+
+class TestGPIOEvents(unittest.TestCase):
+    def setUp(self):
+        self.handle = RaspiGPIOHandle.create_instance()
+        self.addCleanup(self.handle.shutdown)
+
+    def connect(self, frames, acks):
+        ws = FakeWebSocket(frames, acks)
+        run(self.handle.process(ws, '/gpio', resumable=True))
+        return ws
+
+    def test_queue_depth_is_per_channel(self):
+        GPIO.wire(5, 20)
+        GPIO.wire(6, 21)
+        frames = [dict(handle='setmode', mode=GPIO.BCM), setup(5, GPIO.OUT), setup(6, GPIO.OUT),
+                  setup(20, GPIO.IN), setup(21, GPIO.IN),
+                  dict(handle='subscribe', channel=20, edge=GPIO.BOTH, queue_depth=2),
+                  dict(handle='subscribe', channel=21, edge=GPIO.BOTH, queue_depth=0)]
+        ws = self.connect(frames, acks=len(frames))
+        self.assertTrue(all(reply['ack'] for reply in ws.replies), ws.replies)
+
+        # Client disconnected, session kept, events are queued
+        for level in (1, 0, 1, 0, 1):
+            GPIO.output(5, level)
+            GPIO.output(6, level)
+
+        run(asyncio.sleep(0.2))
+
+        # Next event flushes queued events
+        ws = self.connect([dict(handle='output', channel=6, value=0)], acks=2)
+        pushes = [reply for reply in ws.replies if reply.get('handle') == 'event']
+        events = [event['channel'] for push in pushes for event in push['events']]
+        self.assertEqual(events.count(20), 2)
+        self.assertEqual(events.count(21), 6)
+        self.assertEqual(sum(push['overflow'] for push in pushes), 3)
+
+    def test_invalid_queue_depth(self):
+        frames = [dict(handle='setmode', mode=GPIO.BCM), setup(22, GPIO.IN),
+                  dict(handle='subscribe', channel=22, edge=GPIO.RISING, queue_depth=-1),
+                  dict(handle='subscribe', channel=22, edge=GPIO.RISING, queue_depth='1')]
+        ws = run_client(self.handle, frames, acks=len(frames))
+        self.assertEqual([reply['ack'] for reply in ws.replies], [True, True, False, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
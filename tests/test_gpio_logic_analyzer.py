@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import array
+import unittest
+from raspi_ios.gpio_port import GPIOPortBackend
+from raspi_ios.gpio_logic_analyzer import GPIOLogicAnalyzer
+
+
+class SequencePortBackend(GPIOPortBackend):
+    """Port reads samples in sequence, then keeps the last one"""
+    def __init__(self, samples):
+        self.samples = list(samples)
+
+    def read(self, mask):
+        return (self.samples.pop(0) if len(self.samples) > 1 else self.samples[0]) & mask
+
+
+class TestGPIOLogicAnalyzer(unittest.TestCase):
+    def test_edge_trigger_capture(self):
+        backend = SequencePortBackend([0, 0, 0, 1, 1, 0, 1])
+        analyzer = GPIOLogicAnalyzer(backend, 1, 0, pre=2, post=4, trigger=(1, 1, 1))
+        samples, info = analyzer.capture()
+
+        self.assertEqual(list(samples), [0, 0, 1, 1, 0, 1])
+        self.assertEqual(info['trigger'], 2)
+        self.assertEqual(GPIOLogicAnalyzer.decode(GPIOLogicAnalyzer.encode(samples)), samples)
+
+    def test_trigger_timeout(self):
+        analyzer = GPIOLogicAnalyzer(SequencePortBackend([0]), 1, 1000, trigger=(1, 1, 1), timeout=0.05)
+        with self.assertRaises(TimeoutError):
+            analyzer.capture()
+
+    def test_capture_duration_is_bounded(self):
+        backend = SequencePortBackend([0])
+        with self.assertRaises(ValueError):
+            GPIOLogicAnalyzer(backend, 1, 1.0, post=GPIOLogicAnalyzer.MAX_DEPTH)
+
+        with self.assertRaises(ValueError):
+            GPIOLogicAnalyzer(backend, 1, 100, pre=1000, post=1000)
+
+        for timeout in (0, None, GPIOLogicAnalyzer.MAX_DURATION + 1):
+            with self.assertRaises(ValueError):
+                GPIOLogicAnalyzer(backend, 1, 1000, timeout=timeout)
+
+        GPIOLogicAnalyzer(backend, 1, 100, pre=500, post=500, timeout=GPIOLogicAnalyzer.MAX_DURATION)
+
+    def test_rle_long_run(self):
+        samples = array.array(GPIOLogicAnalyzer.RLE_TYPE, [3] * 1000 + [1])
+        self.assertEqual(len(GPIOLogicAnalyzer.encode(samples)), 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
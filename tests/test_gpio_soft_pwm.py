@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import time
+import unittest
+import threading
+from raspi_ios.gpio_port import GPIOPortBackend
+from raspi_ios.gpio_soft_pwm import GPIOSoftPWMScheduler
+
+
+class LevelPortBackend(GPIOPortBackend):
+    """Port keeps written level, counts writes, raise error after closed"""
+    def __init__(self):
+        self.level = 0
+        self.writes = 0
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def write(self, set_mask, clear_mask):
+        if self.closed:
+            raise ValueError("port is closed")
+
+        with self.lock:
+            self.level = (self.level | set_mask) & ~clear_mask
+            self.writes += 1
+
+
+class TestGPIOSoftPWMScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = GPIOSoftPWMScheduler.get_instance()
+
+    def start(self, backend, channel, duty, frequency=500):
+        self.scheduler.add(backend, channel, frequency)
+        self.scheduler.update(backend, channel, duty)
+        self.addCleanup(self.scheduler.remove, backend, channel)
+
+    def test_channels_are_keyed_by_backend(self):
+        first, second = LevelPortBackend(), LevelPortBackend()
+        self.start(first, 7, 100)
+        self.start(second, 7, 50)
+
+        self.scheduler.remove(second, 7)
+        self.assertEqual(first.level, 1 << 7)
+        self.assertEqual(second.level, 0)
+        self.assertEqual(self.scheduler.stats(first, 7)['duty'], 100)
+        with self.assertRaises(ValueError):
+            self.scheduler.stats(second, 7)
+
+        self.scheduler.update(first, 7, 0)
+        self.assertEqual(first.level, 0)
+
+    def test_failed_backend_is_dropped(self):
+        good, bad = LevelPortBackend(), LevelPortBackend()
+        self.start(good, 5, 50)
+        self.start(bad, 5, 50)
+        self.start(bad, 6, 50)
+
+        time.sleep(0.05)
+        bad.closed = True
+        time.sleep(0.05)
+        writes = good.writes
+        time.sleep(0.05)
+
+        self.assertGreater(good.writes, writes)
+        for channel in (5, 6):
+            with self.assertRaises(ValueError):
+                self.scheduler.stats(bad, channel)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import types
+import unittest
+from raspi_ios.gpio_port import GPIOPortBackend
+from raspi_ios.gpio_soft_spi import GPIOSoftSPIEngine
+
+
+class SlavePortBackend(GPIOPortBackend):
+    """SPI slave on a port, latches MOSI on clock rising, MISO shifts out reply bits"""
+    def __init__(self, spi, reply_bits=()):
+        self.level = 0
+        self.spi = spi
+        self.received = list()
+        self.reply_bits = list(reply_bits)
+
+    def write(self, set_mask, clear_mask):
+        previous, self.level = self.level, (self.level | set_mask) & ~clear_mask
+        clk = 1 << self.spi.clk
+        if not previous & clk and self.level & clk:
+            self.received.append(1 if self.level & (1 << self.spi.mosi) else 0)
+
+    def read(self, mask):
+        return mask if self.reply_bits and self.reply_bits.pop(0) else 0
+
+
+def get_spi(bits_per_word=8):
+    return types.SimpleNamespace(cs=8, clk=11, mosi=10, miso=9, bits_per_word=bits_per_word)
+
+
+def to_bits(words, bits):
+    return [(word >> (bits - 1 - i)) & 1 for word in words for i in range(bits)]
+
+
+class TestGPIOSoftSPIEngine(unittest.TestCase):
+    def test_write_and_read(self):
+        spi = get_spi()
+        backend = SlavePortBackend(spi, to_bits([0xa5, 0x3c], 8))
+        engine = GPIOSoftSPIEngine(spi, backend)
+
+        self.assertEqual(engine.transfer([0x12, 0xff, 0x100], 2), [0xa5, 0x3c])
+        self.assertEqual(backend.received[:24], to_bits([0x12, 0xff, 0x00], 8))
+        self.assertEqual(engine.stats['bits'], 40)
+
+    def test_word_edges_cache_is_bounded(self):
+        spi = get_spi(16)
+        engine = GPIOSoftSPIEngine(spi, SlavePortBackend(spi))
+        words = list(range(0, 0x10000, 7))
+        engine.transfer(words, 0)
+        engine.transfer(words, 0, strobe=True)
+
+        self.assertLessEqual(len(engine._GPIOSoftSPIEngine__words), GPIOSoftSPIEngine.CACHE_SIZE)
+        self.assertIs(engine.get_word_edges(words[-1], True), engine.get_word_edges(words[-1], True))
+
+
+if __name__ == '__main__':
+    unittest.main()
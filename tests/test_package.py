@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import unittest
+import subprocess
+
+
+def run_python(code):
+    """Run code in a fresh interpreter, package import state is not shared with test process"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    return subprocess.check_output([sys.executable, '-c', code], env=env, cwd=root).decode().split()
+
+
+class TestPackageExports(unittest.TestCase):
+    def test_handle_modules_imported_on_access(self):
+        output = run_python(
+            "import sys, raspi_ios\n"
+            "print('raspi_ios.gpio' in sys.modules)\n"
+            "print(raspi_ios.RaspiGPIOHandle.__name__, 'raspi_ios.gpio' in sys.modules)\n"
+        )
+        self.assertEqual(output, ['False', 'RaspiGPIOHandle', 'True'])
+
+    def test_star_import(self):
+        output = run_python("from raspi_ios import *\nprint(RaspiSerialHandle.__name__, RaspiWirelessHandle.__name__)")
+        self.assertEqual(output, ['RaspiSerialHandle', 'RaspiWirelessHandle'])
+
+    def test_eager_import_without_module_getattr(self):
+        output = run_python(
+            "import sys\n"
+            "version, sys.version_info = sys.version_info, (3, 6, 9)\n"
+            "import raspi_ios\n"
+            "sys.version_info = version\n"
+            "print('RaspiGPIOHandle' in vars(raspi_ios), 'RaspiSPIFlashHandle' in vars(raspi_ios))\n"
+        )
+        self.assertEqual(output, ['True', 'True'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import time
+import base64
+import unittest
+import threading
+from unittest import mock
+from .util import run_client
+from raspi_ios.serial import RaspiSerialHandle
+
+
+class RecordingPort(object):
+    """Serial port writes byte by byte, concurrent writes would interleave"""
+    def __init__(self, **kwargs):
+        self.is_open = True
+        self.written = bytearray()
+        self.lock = threading.Lock()
+
+    def write(self, data):
+        for byte in data:
+            with self.lock:
+                self.written.append(byte)
+            time.sleep(0.001)
+
+        return len(data)
+
+    def fileno(self):
+        return -1
+
+    def flushInput(self):
+        pass
+
+    def flushOutput(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+class TestSerialWrite(unittest.TestCase):
+    def test_concurrent_writes_keep_order(self):
+        port = RecordingPort()
+        handle = RaspiSerialHandle.create_instance()
+        init = dict(handle='init', port='/dev/ttyS0', baudrate=115200, bytesize=8, parity='N', stopbits=1, timeout=1)
+        payloads = [base64.b64encode(c * 10).decode() for c in (b'A', b'B', b'C', b'D')]
+        writes = [dict(handle='write', id=n, data=payload) for n, payload in enumerate(payloads)]
+
+        with mock.patch('raspi_ios.serial.serial.Serial', return_value=port), mock.patch('fcntl.flock'):
+            ws = run_client(handle, [init] + writes, acks=5)
+
+        self.assertEqual(bytes(port.written), b'A' * 10 + b'B' * 10 + b'C' * 10 + b'D' * 10)
+        self.assertEqual(sorted(reply.get('id') for reply in ws.replies[1:]), [0, 1, 2, 3])
+        self.assertTrue(all(reply.get('ack') for reply in ws.replies))
+
+
+if __name__ == '__main__':
+    unittest.main()
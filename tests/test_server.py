@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+from .util import FakeWebSocket, run
+from raspi_ios.core import RaspiIOHandle
+from raspi_ios.server import RaspiIOServer
+
+
+class CounterHandle(RaspiIOHandle):
+    PATH = 'counter'
+    instances = list()
+
+    def __init__(self):
+        super(CounterHandle, self).__init__()
+        self.count = 0
+        self.closed = False
+        CounterHandle.instances.append(self)
+
+    @staticmethod
+    def get_nodes():
+        return ['counter']
+
+    def shutdown(self):
+        self.closed = True
+
+    async def increase(self, ws, data):
+        self.count += 1
+        return self.count
+
+
+class TestSession(unittest.TestCase):
+    def setUp(self):
+        CounterHandle.instances = list()
+        self.server = RaspiIOServer(single_port=True, session_timeout=0.2)
+        self.assertTrue(self.server.register(CounterHandle))
+
+    def connect(self, path, times=1):
+        ws = FakeWebSocket([dict(handle='increase')] * times, acks=times)
+        run(self.server.dispatch_client(ws, path, 0))
+        return [reply['data'] for reply in ws.replies]
+
+    def test_resume(self):
+        self.assertEqual(self.connect('/counter?session=abc', 2), [1, 2])
+        self.assertEqual(self.connect('/counter?session=abc'), [3])
+        self.assertEqual(len(CounterHandle.instances), 1)
+        self.assertFalse(CounterHandle.instances[0].closed)
+
+    def test_other_session(self):
+        self.assertEqual(self.connect('/counter?session=abc', 2), [1, 2])
+        self.assertEqual(self.connect('/counter?session=xyz'), [1])
+        self.assertEqual(self.connect('/counter'), [1])
+        self.assertEqual(len(CounterHandle.instances), 3)
+
+        # Client without session is shutdown on disconnect
+        self.assertTrue(CounterHandle.instances[2].closed)
+        self.assertFalse(CounterHandle.instances[0].closed)
+
+    def test_expire(self):
+        self.assertEqual(self.connect('/counter?session=abc'), [1])
+        run(asyncio.sleep(0.3))
+        self.assertTrue(CounterHandle.instances[0].closed)
+
+        # Expired session starts over
+        self.assertEqual(self.connect('/counter?session=abc'), [1])
+        self.assertEqual(len(CounterHandle.instances), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import time
+import unittest
+from unittest import mock
+from .util import run_client
+from raspi_ios.core import RaspiIOHandle
+from raspi_ios.validator import RaspiMsgValidator
+from raspi_io.core import RaspiBaseMsg
+
+
+class SleepMsg(RaspiBaseMsg):
+    _handle = 'sleep'
+    _properties = {'seconds'}
+
+
+class TraceHandle(RaspiIOHandle):
+    PATH = 'trace'
+
+    def sleep(self, ws, data):
+        time.sleep(self.decode_request(SleepMsg, data).seconds)
+        return True
+
+
+class TestTrace(unittest.TestCase):
+    def test_request_is_decoded_once(self):
+        frames = [dict(handle='sleep', seconds=0.05, trace=True), dict(handle='sleep', seconds=0, id=1, trace=True)]
+        with mock.patch.object(RaspiMsgValidator, 'decode', autospec=True,
+                               side_effect=RaspiMsgValidator.decode) as decode:
+            ws = run_client(TraceHandle.create_instance(), frames, acks=2)
+
+        self.assertEqual(decode.call_count, 2)
+        for reply in ws.replies:
+            self.assertTrue(reply['ack'])
+            self.assertGreater(reply['trace']['validate_ns'], 0)
+
+        self.assertGreaterEqual(ws.replies[0]['trace']['handle_ns'], 50000000)
+        self.assertLess(ws.replies[0]['trace']['validate_ns'], 50000000)
+
+    def test_untraced_request(self):
+        ws = run_client(TraceHandle.create_instance(), [dict(handle='sleep', seconds=0)], acks=1)
+        self.assertNotIn('trace', ws.replies[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import unittest
+from .util import run_client
+from raspi_ios.core import RaspiIOHandle
+from raspi_ios.validator import RaspiMsgValidator
+from raspi_io.core import RaspiBaseMsg, RaspiMsgDecodeError
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class EchoMsg(RaspiBaseMsg):
+    _handle = 'echo'
+    _properties = {'value'}
+
+
+class DefaultMsg(RaspiBaseMsg):
+    _handle = 'default'
+    _properties = {'value'}
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('value', 1)
+        super(DefaultMsg, self).__init__(**kwargs)
+
+
+class EchoHandle(RaspiIOHandle):
+    PATH = 'echo'
+    CATCH_EXCEPTIONS = ()
+
+    async def echo(self, ws, data):
+        return self.decode_request(EchoMsg, data).value
+
+
+class TestValidator(unittest.TestCase):
+    def test_fast_path(self):
+        validator = RaspiMsgValidator.get(EchoMsg)
+        self.assertIsNotNone(validator.extra)
+
+        message = validator.decode(dict(handle='echo', value=3))
+        self.assertIsInstance(message, EchoMsg)
+        self.assertEqual(message.value, 3)
+        self.assertIsNone(validator.decode(dict(handle='echo', value=None)).value)
+
+        with self.assertRaises(RaspiMsgDecodeError):
+            validator.decode(dict(handle='echo'))
+
+        self.assertFalse(hasattr(validator.decode(dict(handle='echo'), trusted=True), 'value'))
+
+    def test_generic_path(self):
+        validator = RaspiMsgValidator.get(DefaultMsg)
+        self.assertIsNone(validator.extra)
+        self.assertEqual(validator.decode(dict(handle='default')).value, 1)
+        self.assertEqual(validator.decode(dict(handle='default', value=2)).value, 2)
+
+    def test_non_str_keys(self):
+        for message in (EchoMsg, DefaultMsg):
+            with self.assertRaises(RaspiMsgDecodeError):
+                RaspiMsgValidator.get(message).decode({'handle': 'echo', 'value': 1, 1: 2})
+
+            with self.assertRaises(RaspiMsgDecodeError):
+                RaspiMsgValidator.get(message).decode({'handle': 'echo', 'value': 1, b'value': 2})
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_non_str_keys_keep_connection(self):
+        requests = [{'handle': 'echo', 'value': 1, b'value': 2}, {'handle': 'echo', 'value': 2}]
+        frames = [msgpack.packb(request, use_bin_type=True) for request in requests]
+        ws = run_client(EchoHandle.create_instance(), frames, acks=2, path='/echo?codec=msgpack')
+
+        replies = [msgpack.unpackb(frame, raw=False) for frame in ws.sent]
+        self.assertEqual([reply['ack'] for reply in replies], [False, True])
+        self.assertEqual(replies[1]['data'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
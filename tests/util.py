@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import json
+import asyncio
+import websockets
+__all__ = ['FakeWebSocket', 'run_client', 'run']
+
+
+class FakeWebSocket(object):
+    """Client side of a websocket connection, frames are received in order, then waits acks and closes
+
+    :param frames: frames client sends, dict is sent as json
+    :param acks: connection is closed after this number of frames are sent by server
+    :param timeout: max time to wait acks
+    """
+    remote_address = ('test', 0)
+
+    def __init__(self, frames, acks=0, timeout=5.0):
+        self.open = True
+        self.sent = list()
+        self.frames = list(frames)
+        self.acks = acks
+        self.timeout = timeout
+
+    async def recv(self):
+        if self.frames:
+            frame = self.frames.pop(0)
+            return frame if isinstance(frame, (bytes, str)) else json.dumps(frame)
+
+        deadline = asyncio.get_event_loop().time() + self.timeout
+        while len(self.sent) < self.acks and asyncio.get_event_loop().time() < deadline:
+            await asyncio.sleep(0.01)
+
+        self.open = False
+        raise websockets.ConnectionClosed(1000, '')
+
+    async def send(self, data):
+        self.sent.append(data)
+
+    @property
+    def replies(self):
+        """Server json frames decoded"""
+        return [json.loads(frame) for frame in self.sent if isinstance(frame, str)]
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+def run_client(handle, frames, acks=0, path='/test'):
+    """Process a client connection on handle instance
+
+    :param handle: handle instance
+    :param frames: frames client sends
+    :param acks: wait this number of server frames before closing
+    :param path: request url
+    :return: FakeWebSocket
+    """
+    ws = FakeWebSocket(frames, acks)
+    run(handle.process(ws, path))
+    return ws